@@ -4,14 +4,11 @@ from fastapi.responses import JSONResponse, StreamingResponse
 import os
 from dotenv import load_dotenv
 import logging
-import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
-from openai import AsyncOpenAI
 from datetime import datetime
-import json
-import asyncio
+import orjson
 
 # Load environment variables FIRST!
 load_dotenv()
@@ -20,15 +17,17 @@ from routers.documents import router as documents_router
 from routers.sessions import router as sessions_router
 
 # Import Enhanced RAG services
+from services.openai_client import get_async_openai_client
 from services.self_querying_service import SelfQueryingService
 from services.query_expansion_service import QueryExpansionService
 from services.vector_service import VectorService
-from services.response_generator import ResponseGenerator, get_response_generator
+from services.response_generator import ResponseGenerator, format_metadata_for_prompt, get_response_generator
 from models.document import SearchQuery
 
 # Import Conversation Memory services
 from services.conversation_memory_service import ConversationMemoryService
 from services.named_entity_extractor import NamedEntityExtractor
+from services.embedding_cache import EmbeddingCache
 from services.context_aware_enhancer import ContextAwareEnhancer
 from models.conversation import MessageRole
 
@@ -36,19 +35,21 @@ from models.conversation import MessageRole
 logging.basicConfig(level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")))
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Initialize OpenAI client (shared keep-alive connection pool)
+client = get_async_openai_client()
 
 # Initialize Conversation Memory services
 conversation_memory_service = ConversationMemoryService()
-named_entity_extractor = NamedEntityExtractor(client)
+# One embedding cache for every service that embeds the user's message
+embedding_cache = EmbeddingCache(client)
+named_entity_extractor = NamedEntityExtractor(client, embedding_cache=embedding_cache)
 context_aware_enhancer = ContextAwareEnhancer(conversation_memory_service, named_entity_extractor, client)
 
 # Initialize Enhanced RAG services with conversation context
 self_querying_service = SelfQueryingService(client, context_enhancer=context_aware_enhancer)
 # Add conversation memory service for context-aware parsing
 self_querying_service.conversation_memory_service = conversation_memory_service
-query_expansion_service = QueryExpansionService(client)
+query_expansion_service = QueryExpansionService(client, embedding_cache=embedding_cache)
 vector_service = VectorService()
 response_generator = get_response_generator(client)
 
@@ -173,6 +174,7 @@ async def enhanced_chat(chat_message: ChatMessage):
                 search_results_dict = []
                 for i, result in enumerate(search_results.results):
                     search_results_dict.append({
+                        'id': result.chunk_id,
                         'content': result.text,
                         'metadata': result.metadata.model_dump(),
                         'similarity': result.similarity_score,
@@ -407,7 +409,7 @@ async def enhanced_chat_stream(chat_message: ChatMessage):
                         
                         detailed_context += f"\n--- DOKUMENT {i}: {source_file} (Relevantnost: {similarity:.1%}) ---\n"
                         detailed_context += f"KOMPLETNI SADRŽAJ:\n{content}\n"
-                        detailed_context += f"METADATA: {metadata}\n"
+                        detailed_context += f"METADATA: {format_metadata_for_prompt(metadata)}\n"
                         detailed_context += "-" * 80 + "\n"
                     
                     system_prompt = f"""Ti si TurBot, profesionalni turistički agent sa pristupom KOMPLETNIM informacijama o aranžmanima.
@@ -502,9 +504,7 @@ KRITIČNO:
                             "content": content,
                             "chunk_id": chunk_count
                         }
-                        yield f"data: {json.dumps(data)}\n\n"
-                        
-                        await asyncio.sleep(0.02)
+                        yield b"data: " + orjson.dumps(data) + b"\n\n"
 
                 # Step 8: Generate suggested questions
                 suggested_questions = []
@@ -548,7 +548,7 @@ KRITIČNO:
                     "entities_extracted": len(entity_extraction_result.entities) if entity_extraction_result.entities else 0
                 }
                 
-                yield f"data: {json.dumps(final_data)}\n\n"
+                yield b"data: " + orjson.dumps(final_data) + b"\n\n"
                 
                 # Step 11: Save AI response to conversation memory
                 await conversation_memory_service.save_message(
@@ -568,7 +568,7 @@ KRITIČNO:
                     "session_id": session_id,
                     "fallback_message": "Izvinjavam se, došlo je do greške pri obradi vašeg upita. Molim pokušajte ponovo sa drugačijim pitanjem."
                 }
-                yield f"data: {json.dumps(error_data)}\n\n"
+                yield b"data: " + orjson.dumps(error_data) + b"\n\n"
         
         return StreamingResponse(
             enhanced_rag_stream_generator(),
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Dict, List, Any, Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Dict, List, Any, Literal, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -31,6 +31,14 @@ class TourismEntity(BaseModel):
     frequency: int = 1
     source_messages: List[str] = Field(default_factory=list)  # Message IDs
     
+    @model_validator(mode="before")
+    @classmethod
+    def _default_last_mentioned(cls, data: Any) -> Any:
+        """A newly extracted entity was last mentioned when it was first mentioned"""
+        if isinstance(data, dict) and data.get("last_mentioned") is None and "first_mentioned" in data:
+            data = {**data, "last_mentioned": data["first_mentioned"]}
+        return data
+    
 class ConversationContext(BaseModel):
     """Complete conversation context with hybrid approach"""
     session_id: str
@@ -46,11 +54,24 @@ class ConversationContext(BaseModel):
     last_updated: datetime
     context_switch_detected: bool = False
 
+class ExtractedEntities(BaseModel):
+    """Structured output schema for LLM entity extraction (null = not mentioned)"""
+    model_config = ConfigDict(extra="forbid")
+    
+    destination: Optional[str]
+    price_max: Optional[int]
+    travel_month: Optional[str]
+    group_size: Optional[int]
+    family_friendly: Optional[bool]
+    category: Optional[Literal["hotel", "apartment", "tour"]]
+    transport_type: Optional[Literal["plane", "bus", "train"]]
+    amenities: Optional[List[str]]
+
 class EntityExtractionResult(BaseModel):
     """Result from entity extraction process"""
     entities: Dict[str, TourismEntity]
     confidence: float
-    extraction_method: str  # "llm", "rule_based", "hybrid"
+    extraction_method: str  # "llm", "rule_based", "rules_only", "hybrid"
     processing_time: float
 
 class ContextEnhancementResult(BaseModel):
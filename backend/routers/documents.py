@@ -3,12 +3,11 @@ from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Dict, Any, Optional
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-import json
-import openai
-import os
+import orjson
 from pydantic import BaseModel
 
 from services.document_service import DocumentService
+from services.openai_client import get_async_openai_client
 from models.document import SearchQuery, SearchResponse
 from services.document_detail_service import DocumentDetailService
 
@@ -330,8 +329,8 @@ class ChatMessage(BaseModel):
     """Simple chat message for streaming endpoint"""
     content: str
 
-# Initialize OpenAI client for streaming (separate from existing services)
-streaming_openai_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OpenAI client for streaming (shares the server-wide connection pool)
+streaming_openai_client = get_async_openai_client()
 
 @router.post("/chat/stream")
 async def chat_stream(
@@ -403,10 +402,7 @@ INSTRUKCIJE:
                         "content": content,
                         "chunk_id": chunk_count
                     }
-                    yield f"data: {json.dumps(data)}\n\n"
-                    
-                    # Small delay for natural typing feel
-                    await asyncio.sleep(0.02)
+                    yield b"data: " + orjson.dumps(data) + b"\n\n"
             
             print(f"🎬 STREAMING COMPLETED: {len(full_response)} chars, {chunk_count} chunks")
             
@@ -431,7 +427,7 @@ INSTRUKCIJE:
                 "total_chunks": chunk_count,
                 "response_length": len(full_response)
             }
-            yield f"data: {json.dumps(final_data)}\n\n"
+            yield b"data: " + orjson.dumps(final_data) + b"\n\n"
             
             print(f"🎉 STREAMING CHAT COMPLETED: {len(full_response)} chars")
             
@@ -442,7 +438,7 @@ INSTRUKCIJE:
                 "error": str(e),
                 "fallback_message": "Izvinjavam se, došlo je do greške. Molim pokušajte ponovo."
             }
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield b"data: " + orjson.dumps(error_data) + b"\n\n"
     
     return StreamingResponse(
         generate_stream(),
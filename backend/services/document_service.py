@@ -1,12 +1,13 @@
 from typing import List, Dict, Any, Optional, BinaryIO
+from itertools import islice
 from pathlib import Path
 import shutil
 import tempfile
 import os
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import logging
 
+from services.openai_client import create_async_openai_client
 from services.pdf_processor import PDFProcessor
 from services.vector_service import VectorService
 from models.document import ProcessedDocument, SearchQuery, SearchResponse
@@ -17,14 +18,18 @@ load_dotenv()
 # Configure detailed logging
 logger = logging.getLogger(__name__)
 
+# Directory loads read this many paths at a time and store each group before
+# reading the next; a group shares one extraction pool and metadata loop
+DIRECTORY_BATCH_FILES = int(os.getenv("DIRECTORY_BATCH_FILES", "8"))
+
 class DocumentService:
     """Service for managing document upload, processing, and search"""
     
     def __init__(self):
         logger.info("🚀 Initializing DocumentService...")
         
-        # Initialize OpenAI client for enhanced metadata
-        openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Initialize OpenAI client for enhanced metadata (each asyncio.run calls through a loop-bound copy)
+        openai_client = create_async_openai_client()
         
         # Initialize services with enhanced metadata support
         self.pdf_processor = PDFProcessor(openai_client=openai_client)
@@ -42,6 +47,10 @@ class DocumentService:
         
         # Process PDF into chunks
         processed_doc = self.pdf_processor.process_pdf(file_path)
+        return self._store_processed_document(processed_doc, file_path)
+    
+    def _store_processed_document(self, processed_doc: ProcessedDocument, file_path: str) -> ProcessedDocument:
+        """Store the chunks of a processed PDF in the vector database"""
         logger.info(f"📊 PDF processing result: {processed_doc.processing_status}, {processed_doc.total_chunks} chunks")
         
         if processed_doc.processing_status == "success" and processed_doc.chunks:
@@ -55,6 +64,10 @@ class DocumentService:
                 processed_doc.processing_status = "error"
                 processed_doc.error_message = "Failed to store chunks in vector database"
                 logger.error(f"❌ Failed to store chunks for {file_path}")
+            else:
+                self.vector_service.delete_stale_chunks(
+                    processed_doc.filename, [chunk.id for chunk in processed_doc.chunks]
+                )
         else:
             logger.warning(f"⚠️ PDF processing failed or no chunks created for {file_path}")
         
@@ -99,19 +112,29 @@ class DocumentService:
             logger.error(f"❌ Directory does not exist: {directory_path}")
             return results
         
-        # Find all PDF files
-        pdf_files = list(directory.glob("**/*.pdf"))
-        logger.info(f"📋 Found {len(pdf_files)} PDF files to process")
-        
-        for i, pdf_file in enumerate(pdf_files, 1):
-            logger.info(f"🔄 Processing file {i}/{len(pdf_files)}: {pdf_file.name}")
-            processed_doc = self.process_and_store_pdf(str(pdf_file))
-            results.append(processed_doc)
+        # Stream PDF paths lazily; only pay for a counting pass when it will be logged
+        total = "?"
+        if logger.isEnabledFor(logging.INFO):
+            total = sum(1 for _ in directory.rglob("*.pdf"))
+            logger.info(f"📋 Found {total} PDF files to process")
+        
+        pdf_paths = directory.rglob("*.pdf")
+        group_size = max(1, DIRECTORY_BATCH_FILES)
+        while True:
+            group = list(islice(pdf_paths, group_size))
+            if not group:
+                break
+            processed_docs = self.pdf_processor.process_pdfs_batch([str(pdf_file) for pdf_file in group])
             
-            if processed_doc.processing_status == "success":
-                logger.info(f"✅ Successfully processed {pdf_file.name}")
-            else:
-                logger.error(f"❌ Failed to process {pdf_file.name}: {processed_doc.error_message}")
+            for pdf_file, processed_doc in zip(group, processed_docs):
+                logger.info(f"🔄 Storing file {len(results) + 1}/{total}: {pdf_file.name}")
+                processed_doc = self._store_processed_document(processed_doc, str(pdf_file))
+                results.append(processed_doc)
+                
+                if processed_doc.processing_status == "success":
+                    logger.info(f"✅ Successfully processed {pdf_file.name}")
+                else:
+                    logger.error(f"❌ Failed to process {pdf_file.name}: {processed_doc.error_message}")
         
         # Summary
         successful = len([r for r in results if r.processing_status == 'success'])
@@ -145,11 +168,12 @@ class DocumentService:
         
         # Remove from storage
         file_path = self.uploads_dir / filename
-        if file_path.exists():
-            try:
-                file_path.unlink()
-            except Exception as e:
-                pass
+        try:
+            file_path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Could not remove {file_path}: {e}")
         
         return success
     
@@ -161,16 +185,17 @@ class DocumentService:
         """Get information about a specific document"""
         file_path = self.uploads_dir / filename
         
-        if not file_path.exists():
+        # Single stat() call doubles as the existence check
+        try:
+            file_size = file_path.stat().st_size
+        except FileNotFoundError:
             return {"error": "Document not found"}
         
-        # Get file size
-        file_size = file_path.stat().st_size
-        
-        # Get chunks count from vector database
+        # Get chunks count from vector database (ids only; documents and metadata aren't needed)
         try:
             results = self.vector_service.collection.get(
-                where={"source_file": filename}
+                where={"source_file": filename},
+                include=[]
             )
             chunks_count = len(results["ids"]) if results["ids"] else 0
             
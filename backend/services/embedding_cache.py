@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Request-level memo of text embeddings: bounded LRU, entries expire after an hour
+EMBEDDING_CACHE_MAX_ENTRIES = 1024
+EMBEDDING_CACHE_TTL_SECONDS = 3600
+
+class EmbeddingCache:
+    """
+    Unit-normalized text embeddings shared by the services that embed user text
+    
+    The entity extractor and query expansion both embed the user's message for
+    their semantic caches. With one shared instance, the same text is embedded
+    once, and concurrent requests for the same text wait on the one call in
+    flight instead of each making their own.
+    """
+    
+    def __init__(self, openai_client: AsyncOpenAI, model: str = EMBEDDING_MODEL):
+        self.client = openai_client
+        self.model = model
+        
+        # text -> (expiry time, embedding), least recently used first
+        self._cache: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Optional[np.ndarray]]"] = {}
+    
+    async def get(self, text: str) -> Optional[np.ndarray]:
+        """Embedding of the text, or None if the embedding call failed"""
+        entry = self._cache.get(text)
+        if entry is not None:
+            expires_at, embedding = entry
+            if expires_at >= time.monotonic():
+                self._cache.move_to_end(text)
+                return embedding
+            del self._cache[text]
+        
+        inflight = self._inflight.get(text)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[text] = future
+        embedding = None
+        try:
+            embedding = await self._embed(text)
+        finally:
+            del self._inflight[text]
+            future.set_result(embedding)
+        
+        if embedding is not None:
+            self._cache[text] = (time.monotonic() + EMBEDDING_CACHE_TTL_SECONDS, embedding)
+            if len(self._cache) > EMBEDDING_CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return embedding
+    
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Call the embeddings API and L2-normalize the result"""
+        try:
+            response = await self.client.embeddings.create(model=self.model, input=text)
+            embedding = np.asarray(response.data[0].embedding, dtype=np.float32)
+            norm = np.linalg.norm(embedding)
+            return embedding / norm if norm else None
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding failed: {e}")
+            return None
@@ -1,17 +1,199 @@
 import asyncio
-import json
+import copy
 import logging
+import os
+import random
 import re
-from typing import Dict, List, Optional, Any, Tuple
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple, Mapping
 from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
 from datetime import datetime
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, RateLimitError
 import hashlib
+import orjson
 from models.document import DocumentMetadata
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Metadata cache settings (in-memory LRU in front of a persistent SQLite store)
+CACHE_MEMORY_CAPACITY = 10_000
+CACHE_TTL_SECONDS = 30 * 86400
+CACHE_DB_PATH = Path(__file__).parent.parent / "cache" / "metadata_cache.sqlite3"
+
+# OpenAI request budget (requests per minute) and 429 retry policy
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Precompiled patterns
+# Applied to pre-lowercased content, so no re.IGNORECASE
+_PRICE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(€|eur|usd|\$|rsd|din)')
+_DURATION_RE = re.compile(r'\b(\d{1,2})\s*(?:dana|days?)\b')
+
+# Static system prompt: identical across calls so OpenAI can reuse the cached prefix
+_SYSTEM_PROMPT = """Ti si ekspert za analizu turističkih dokumenata. Tvoj zadatak je da iz sadržaja dokumenta izvučeš precizne metadata.
+
+VAŽNO: Odgovori SAMO u JSON formatu bez dodatnog teksta.
+
+Analiziraj dokument i izvuci sledeće informacije:
+- destination: Glavna destinacija (grad/zemlja) - OBAVEZNO
+- category: tour/hotel/restaurant/attraction
+- price_range: budget/moderate/expensive/luxury (na osnovu cena)
+- duration_days: Broj dana putovanja (broj)
+- transport_type: bus/plane/train/ship
+- family_friendly: true/false (na osnovu sadržaja)
+- seasonal: year_round/summer/winter/spring/autumn
+- travel_month: konkretni mesec ako je spomenut
+- price_details: JSON sa cenama (single, double, currency)
+- confidence_score: Tvoja sigurnost u izvučene podatke (0.0-1.0)
+
+Primer odgovora:
+{
+  "destination": "Rim",
+  "category": "tour", 
+  "price_range": "moderate",
+  "duration_days": 4,
+  "transport_type": "plane",
+  "family_friendly": true,
+  "seasonal": "year_round",
+  "travel_month": "maj",
+  "price_details": "{\"single\": 450, \"double\": 320, \"currency\": \"EUR\"}",
+  "confidence_score": 0.9
+}"""
+
+# Structured output schema for one document's metadata (OpenAI strict JSON schema)
+_METADATA_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "destination": {"type": "string"},
+        "category": {"type": "string", "enum": ["tour", "hotel", "restaurant", "attraction"]},
+        "price_range": {"type": "string", "enum": ["budget", "moderate", "expensive", "luxury"]},
+        "duration_days": {"type": ["integer", "null"]},
+        "transport_type": {"type": ["string", "null"], "enum": ["bus", "plane", "train", "ship", None]},
+        "family_friendly": {"type": "boolean"},
+        "seasonal": {"type": "string", "enum": ["year_round", "summer", "winter", "spring", "autumn"]},
+        "travel_month": {"type": ["string", "null"]},
+        "price_details": {"type": ["string", "null"]},
+        "confidence_score": {"type": "number"}
+    },
+    "required": ["destination", "category", "price_range", "duration_days", "transport_type",
+                 "family_friendly", "seasonal", "travel_month", "price_details", "confidence_score"],
+    "additionalProperties": False
+}
+
+_METADATA_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "document_metadata", "strict": True, "schema": _METADATA_JSON_SCHEMA}
+}
+
+# Confidence assigned to rule-based results that skip the LLM, and to fallbacks
+CHEAP_EXTRACTION_CONFIDENCE = 0.8
+FALLBACK_CONFIDENCE = 0.1
+UNKNOWN_DESTINATION = "Unknown"
+_CHEAP_REQUIRED_HINTS = ('destination', 'category', 'transport_type')
+
+# Rule-based travel_month/seasonal/family_friendly for the cheap path, applied to
+# the lowercased filename and content. Months are stored in English, the form the
+# query-side travel_month filter uses.
+_MONTH_RE = re.compile(
+    r'\b(?:(januar|februar|mart|april|maj|jun|jul|avgust)(?:a|u|om)?'
+    r'|(septemb|oktob|novemb|decemb)(?:ar|ra|ru|rom))\b'
+)
+_MONTH_NAMES = {
+    'januar': 'january', 'februar': 'february', 'mart': 'march', 'april': 'april',
+    'maj': 'may', 'jun': 'june', 'jul': 'july', 'avgust': 'august',
+    'septemb': 'september', 'oktob': 'october', 'novemb': 'november', 'decemb': 'december',
+}
+_MONTH_SEASONS = {
+    'january': 'winter', 'february': 'winter', 'march': 'spring', 'april': 'spring',
+    'may': 'spring', 'june': 'summer', 'july': 'summer', 'august': 'summer',
+    'september': 'autumn', 'october': 'autumn', 'november': 'autumn', 'december': 'winter',
+}
+_SEASON_RE = re.compile(
+    r'\b(?:(?P<summer>let[oau]|letnj\w*)|(?P<winter>zim[aeiu]|zimsk\w*)'
+    r'|(?P<spring>prole[cć][aeu]|prole[cć]n\w*)|(?P<autumn>jesen\w*))\b'
+)
+# Holiday trips imply dates the rules can't place (Nova godina spans two months)
+_HOLIDAY_RE = re.compile(r'nov[aeu] godin|novogodi|do[cč]ek|uskrs|bo[zž]i[cć]|praznik|prvomaj')
+_FAMILY_RE = re.compile(r'\b(?:porodi\w*|deca|decu|dece|deci|dete|deteta|detetu|famil\w*)\b')
+_EUR_UNITS = frozenset(['€', 'eur'])
+
+# Allowed values for AI-extracted fields (hashed lookups)
+_VALID_CATEGORIES = frozenset(['tour', 'hotel', 'restaurant', 'attraction'])
+_VALID_PRICE_RANGES = frozenset(['budget', 'moderate', 'expensive', 'luxury'])
+_VALID_TRANSPORT = frozenset(['bus', 'plane', 'train', 'ship'])
+_VALID_SEASONAL = frozenset(['year_round', 'summer', 'winter', 'spring', 'autumn'])
+
+def _is_allowed(value: Any, allowed: frozenset) -> bool:
+    # LLM output may contain unhashable values (lists/dicts) for these fields
+    return isinstance(value, str) and value in allowed
+
+# Destination detection from filename (earlier entries win)
+_FILENAME_DESTINATIONS = {
+    'amsterdam': 'Amsterdam',
+    'istanbul': 'Istanbul',
+    'rim': 'Rim',
+    'roma': 'Rim',
+    'rome': 'Rim',
+    'pariz': 'Pariz',
+    'paris': 'Pariz',
+    'romanticna_francuska': 'Pariz',
+    'portugalska': 'Lisabon',
+    'portugal': 'Lisabon',
+    'madrid': 'Madrid',
+    'barcelona': 'Barcelona',
+    'maroko': 'Marakeš',
+    'morocco': 'Marakeš',
+    'malta': 'Malta',
+    'bari': 'Bari',
+    'pulja': 'Pulja'
+}
+
+# Filename keyword -> (metadata field, value); per field, earlier entries win
+_FILENAME_HINTS: Dict[str, Tuple[str, str]] = {
+    **{keyword: ('destination', destination) for keyword, destination in _FILENAME_DESTINATIONS.items()},
+    'avio': ('transport_type', 'plane'),
+    'avion': ('transport_type', 'plane'),
+    'bus': ('transport_type', 'bus'),
+    'cenovnik': ('category', 'tour'),
+    'program': ('category', 'tour'),
+    'putovanja': ('category', 'tour'),
+}
+_FILENAME_HINT_RANK = {keyword: i for i, keyword in enumerate(_FILENAME_HINTS)}
+
+def _alternation(words: List[str]) -> str:
+    return "|".join(re.escape(word) for word in words)
+
+# Zero-width lookahead so overlapping keywords are all reported in one pass
+_FILENAME_HINTS_RE = re.compile(r"(?=({}))".format(_alternation(list(_FILENAME_HINTS))))
+
+@lru_cache(maxsize=1024)
+def _filename_hints(filename: str) -> Mapping[str, str]:
+    """Classify destination, transport and category hints in a single regex pass
+    
+    Memoized because every chunk of a PDF shares the same filename.
+    """
+    hints = {}
+    hint_ranks = {}
+    
+    for match in _FILENAME_HINTS_RE.finditer(filename.lower()):
+        keyword = match.group(1)
+        field, value = _FILENAME_HINTS[keyword]
+        rank = _FILENAME_HINT_RANK[keyword]
+        if field not in hint_ranks or rank < hint_ranks[field]:
+            hint_ranks[field] = rank
+            hints[field] = value
+    
+    # Read-only view: the cached result is shared between callers
+    return MappingProxyType(hints)
+
+@dataclass(slots=True)
 class EnhancedMetadata:
     """Enhanced metadata structure for tourism documents"""
     # Basic fields (existing)
@@ -51,11 +233,69 @@ class EnhancedMetadata:
         if self.extracted_at is None:
             self.extracted_at = datetime.now()
 
+class AsyncRateLimiter:
+    """Token-bucket rate limiter: at most max_rate acquisitions per time_period seconds"""
+    
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._tokens = float(max_rate)
+        self._updated_at = time.monotonic()
+    
+    async def acquire(self):
+        """Wait until a token is available, then take it"""
+        while True:
+            now = time.monotonic()
+            refill = (now - self._updated_at) * self.max_rate / self.time_period
+            self._tokens = min(float(self.max_rate), self._tokens + refill)
+            self._updated_at = now
+            
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            
+            await asyncio.sleep((1 - self._tokens) * self.time_period / self.max_rate)
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
 class MetadataEnhancementService:
     """AI-powered metadata enhancement using GPT-4o-mini for maximum precision"""
     
-    def __init__(self, openai_client: AsyncOpenAI):
+    def __init__(self, openai_client: AsyncOpenAI, cache_path: Optional[Path] = CACHE_DB_PATH,
+                 cheap_prefilter: bool = True):
         self.client = openai_client
+        self.cheap_prefilter = cheap_prefilter
+        
+        # Bounded LRU for hot entries; SQLite keeps results across restarts. Both are
+        # shared by with_client copies running on different threads (concurrent
+        # uploads), so every cache read and write holds the lock.
+        self._mem: "OrderedDict[str, DocumentMetadata]" = OrderedDict()
+        self._mem_cap = CACHE_MEMORY_CAPACITY
+        self._disk = self._open_disk_cache(cache_path) if cache_path else None
+        self._cache_lock = threading.Lock()
+        
+        # Futures for LLM requests in flight, keyed by cache key (request coalescing)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        
+        # Shared request budget for all OpenAI calls made by this service
+        self._limiter = AsyncRateLimiter(max_rate=OPENAI_RPM, time_period=60)
+    
+    def with_client(self, openai_client: AsyncOpenAI) -> "MetadataEnhancementService":
+        """
+        Copy of the service that calls through openai_client
+        
+        Caches and the rate limit are shared; in-flight futures belong to one
+        event loop, so the copy gets its own.
+        """
+        service = copy.copy(self)
+        service.client = openai_client
+        service._inflight = {}
+        return service
         
     async def enhance_document_metadata(self, content: str, filename: str) -> DocumentMetadata:
         """
@@ -69,35 +309,54 @@ class MetadataEnhancementService:
             Enhanced DocumentMetadata with AI-extracted fields
         """
         try:
-            # Prepare content for analysis (truncate if too long)
+            # Truncate once; the same text feeds both the cache key and the prompt
             analysis_content = self._prepare_content_for_analysis(content)
             
-            # Create comprehensive extraction prompt
-            extraction_prompt = self._create_extraction_prompt(analysis_content, filename)
+            # Check cache first
+            cache_key = self._get_cache_key(analysis_content, filename)
+            cached_metadata = self._cache_get(cache_key)
+            if cached_metadata is not None:
+                logger.info(f"Cache hit for metadata: {filename}")
+                return cached_metadata
             
-            # Call GPT-4o-mini for metadata extraction
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": extraction_prompt}
-                ],
-                temperature=0.1,  # Low temperature for consistent extraction
-                max_tokens=500
-            )
-            
-            # Parse AI response
-            ai_response = response.choices[0].message.content
-            metadata_dict = self._parse_ai_response(ai_response)
+            # Skip the LLM when rules alone resolve the document confidently
+            if self.cheap_prefilter:
+                cheap_metadata = self._try_cheap_extract(content, filename)
+                if cheap_metadata is not None:
+                    logger.info(f"Rule-based metadata for {filename}: destination={cheap_metadata.destination}, category={cheap_metadata.category}")
+                    return cheap_metadata
             
-            # Add filename-based fallbacks
-            metadata_dict = self._add_filename_based_metadata(metadata_dict, filename)
+            # Join an identical request already in flight on this event loop
+            loop = asyncio.get_running_loop()
+            inflight = self._inflight.get(cache_key)
+            if inflight is not None and inflight.get_loop() is loop:
+                logger.info(f"Joining in-flight metadata request for {filename}")
+                shared_metadata = await asyncio.shield(inflight)
+                if shared_metadata is None:
+                    return self._create_fallback_metadata(filename)
+                return shared_metadata.model_copy()
             
-            # Ensure source_file is set
-            metadata_dict['source_file'] = filename
-            
-            # Create DocumentMetadata object
-            enhanced_metadata = DocumentMetadata(**metadata_dict)
+            future = loop.create_future()
+            self._inflight[cache_key] = future
+            try:
+                # Call GPT-4o-mini for metadata extraction
+                response = await self._create_chat_completion(
+                    **self._build_extraction_request(analysis_content, filename)
+                )
+                
+                # Parse AI response into DocumentMetadata
+                ai_response = response.choices[0].message.content
+                enhanced_metadata = self._build_document_metadata(ai_response, filename)
+                
+                # Cache the result
+                self._cache_set(cache_key, enhanced_metadata)
+                future.set_result(enhanced_metadata)
+            finally:
+                # Waiters fall back on their own if this request failed or was cancelled
+                if not future.done():
+                    future.set_result(None)
+                if self._inflight.get(cache_key) is future:
+                    del self._inflight[cache_key]
             
             logger.info(f"Enhanced metadata for {filename}: destination={enhanced_metadata.destination}, category={enhanced_metadata.category}")
             return enhanced_metadata
@@ -107,95 +366,211 @@ class MetadataEnhancementService:
             # Return basic metadata as fallback
             return self._create_fallback_metadata(filename)
     
+    async def batch_enhance_metadata(self, documents: List[Tuple[str, str]],
+                                     concurrency: int = 10) -> List[DocumentMetadata]:
+        """
+        Enhance metadata for many documents concurrently
+        
+        Args:
+            documents: List of (content, filename) pairs
+            concurrency: Maximum number of in-flight LLM calls
+            
+        Returns:
+            DocumentMetadata list in the same order as documents
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _enhance_one(content: str, filename: str) -> DocumentMetadata:
+            async with semaphore:
+                return await self.enhance_document_metadata(content, filename)
+        
+        tasks = [asyncio.create_task(_enhance_one(content, filename)) for content, filename in documents]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        enhanced = []
+        for (content, filename), result in zip(documents, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error enhancing metadata for {filename}: {result}")
+                result = self._create_fallback_metadata(filename)
+            enhanced.append(result)
+        
+        successful = sum(1 for result in results if not isinstance(result, Exception))
+        logger.info(f"Batch metadata enhancement complete: {successful}/{len(documents)} documents")
+        return enhanced
+    
+    async def _create_chat_completion(self, **kwargs):
+        """Rate-limited chat completion with exponential backoff on 429 responses"""
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            async with self._limiter:
+                try:
+                    return await self.client.chat.completions.create(**kwargs)
+                except RateLimitError:
+                    if attempt == MAX_RATE_LIMIT_RETRIES:
+                        raise
+            
+            delay = 2 ** attempt + random.random()
+            logger.warning(f"OpenAI rate limit hit, retrying in {delay:.1f}s (attempt {attempt + 1}/{MAX_RATE_LIMIT_RETRIES})")
+            await asyncio.sleep(delay)
+    
+    def _get_cache_key(self, analysis_content: str, filename: str) -> str:
+        """Generate cache key from filename and the (truncated) content sent to the LLM"""
+        # BLAKE2b is faster than MD5 on 64-bit CPUs and needs no extra dependency
+        filename_hash = hashlib.blake2b(filename.encode(), digest_size=8).hexdigest()
+        content_hash = hashlib.blake2b(analysis_content.encode(), digest_size=16).hexdigest()
+        return f"{filename_hash}_{content_hash}"
+    
+    def _open_disk_cache(self, cache_path: Path) -> Optional[sqlite3.Connection]:
+        """Open (or create) the persistent metadata cache"""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(cache_path), check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS metadata_cache "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL)"
+            )
+            connection.commit()
+            return connection
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent metadata cache disabled: {e}")
+            return None
+    
+    def _cache_get(self, cache_key: str) -> Optional[DocumentMetadata]:
+        """Look up metadata in the LRU, then on disk (promoting disk hits)"""
+        with self._cache_lock:
+            if cache_key in self._mem:
+                self._mem.move_to_end(cache_key)
+                return self._mem[cache_key].model_copy()
+            
+            if self._disk is None:
+                return None
+            
+            try:
+                row = self._disk.execute(
+                    "SELECT value, stored_at FROM metadata_cache WHERE key = ?", (cache_key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                
+                value, stored_at = row
+                if time.time() - stored_at > CACHE_TTL_SECONDS:
+                    self._disk.execute("DELETE FROM metadata_cache WHERE key = ?", (cache_key,))
+                    self._disk.commit()
+                    return None
+                
+                # Parsed and validated in a single pass by pydantic-core
+                metadata = DocumentMetadata.model_validate_json(value)
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Failed to read metadata cache entry: {e}")
+                return None
+            
+            self._remember(cache_key, metadata)
+            return metadata.model_copy()
+    
+    def _cache_set(self, cache_key: str, metadata: DocumentMetadata):
+        """Store metadata in the LRU and on disk"""
+        with self._cache_lock:
+            self._remember(cache_key, metadata)
+            
+            if self._disk is None:
+                return
+            
+            try:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO metadata_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                    (cache_key, metadata.model_dump_json(exclude_none=True), time.time())
+                )
+                self._disk.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to write metadata cache entry: {e}")
+    
+    def _remember(self, cache_key: str, metadata: DocumentMetadata):
+        """Insert into the in-memory LRU, evicting the least recently used entry (caller holds the lock)"""
+        self._mem[cache_key] = metadata
+        self._mem.move_to_end(cache_key)
+        if len(self._mem) > self._mem_cap:
+            self._mem.popitem(last=False)
+    
+    def _build_extraction_request(self, analysis_content: str, filename: str) -> Dict[str, Any]:
+        """Chat completion parameters for metadata extraction"""
+        return {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": self._get_system_prompt()},
+                {"role": "user", "content": self._create_extraction_prompt(analysis_content, filename)}
+            ],
+            "response_format": _METADATA_RESPONSE_FORMAT,
+            "temperature": 0.1,  # Low temperature for consistent extraction
+            "max_tokens": 500
+        }
+    
+    def _build_document_metadata(self, ai_response: str, filename: str) -> DocumentMetadata:
+        """Turn a raw AI response into DocumentMetadata with filename-based fallbacks"""
+        return self._metadata_from_dict(self._parse_ai_response(ai_response), filename)
+    
+    def _metadata_from_dict(self, metadata_dict: Dict[str, Any], filename: str) -> DocumentMetadata:
+        """Complete cleaned metadata with filename-based fallbacks"""
+        # Add filename-based fallbacks
+        metadata_dict = self._add_filename_based_metadata(metadata_dict, filename)
+        
+        # Ensure source_file is set
+        metadata_dict['source_file'] = filename
+        
+        return DocumentMetadata(**metadata_dict)
+    
     def _get_system_prompt(self) -> str:
         """System prompt for metadata extraction"""
-        return """Ti si ekspert za analizu turističkih dokumenata. Tvoj zadatak je da iz sadržaja dokumenta izvučeš precizne metadata.
-
-VAŽNO: Odgovori SAMO u JSON formatu bez dodatnog teksta.
-
-Analiziraj dokument i izvuci sledeće informacije:
-- destination: Glavna destinacija (grad/zemlja) - OBAVEZNO
-- category: tour/hotel/restaurant/attraction
-- price_range: budget/moderate/expensive/luxury (na osnovu cena)
-- duration_days: Broj dana putovanja (broj)
-- transport_type: bus/plane/train/ship
-- family_friendly: true/false (na osnovu sadržaja)
-- seasonal: year_round/summer/winter/spring/autumn
-- travel_month: konkretni mesec ako je spomenut
-- price_details: JSON sa cenama (single, double, currency)
-- confidence_score: Tvoja sigurnost u izvučene podatke (0.0-1.0)
-
-Primer odgovora:
-{
-  "destination": "Rim",
-  "category": "tour", 
-  "price_range": "moderate",
-  "duration_days": 4,
-  "transport_type": "plane",
-  "family_friendly": true,
-  "seasonal": "year_round",
-  "travel_month": "maj",
-  "price_details": "{\"single\": 450, \"double\": 320, \"currency\": \"EUR\"}",
-  "confidence_score": 0.9
-}"""
+        return _SYSTEM_PROMPT
 
     def _create_extraction_prompt(self, content: str, filename: str) -> str:
-        """Create extraction prompt with content and filename context"""
-        return f"""Analiziraj ovaj turistički dokument i izvuci metadata:
+        """Create extraction prompt; per-document text goes last so the static prefix is cacheable"""
+        return f"""Analiziraj ovaj turistički dokument i izvuci metadata u JSON formatu.
 
 FILENAME: {filename}
 
 SADRŽAJ DOKUMENTA:
-{content}
-
-Izvuci metadata u JSON formatu:"""
+{content}"""
 
     def _prepare_content_for_analysis(self, content: str) -> str:
         """Prepare content for AI analysis (truncate if needed)"""
         # Limit to ~2000 characters to stay within token limits
         if len(content) > 2000:
             # Take first 1000 and last 1000 chars to capture both intro and pricing
-            content = content[:1000] + "\n...\n" + content[-1000:]
+            return "\n...\n".join((content[:1000], content[-1000:]))
         return content
 
     def _parse_ai_response(self, ai_response: str) -> Dict[str, Any]:
         """Parse AI response into metadata dictionary"""
+        # Structured outputs guarantee a bare JSON object matching the schema
         try:
-            # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                metadata_dict = json.loads(json_str)
-                
-                # Validate and clean the response
-                return self._validate_and_clean_metadata(metadata_dict)
-            else:
-                logger.warning("No JSON found in AI response")
-                return {}
-                
-        except json.JSONDecodeError as e:
+            metadata_dict = orjson.loads(ai_response)
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to parse AI response as JSON: {e}")
             return {}
+        
+        # Validate and clean the response
+        return self._validate_and_clean_metadata(metadata_dict)
 
     def _validate_and_clean_metadata(self, metadata_dict: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate and clean AI-extracted metadata"""
+        """Validate and clean AI-extracted metadata
+        
+        Short categorical values are interned: every chunk of every document
+        repeats the same few strings, so all metadata shares one object per value.
+        """
         cleaned = {}
         
         # Destination (most important)
         if 'destination' in metadata_dict and metadata_dict['destination']:
-            cleaned['destination'] = str(metadata_dict['destination']).strip()
+            cleaned['destination'] = sys.intern(str(metadata_dict['destination']).strip())
             # Also set location for backward compatibility
             cleaned['location'] = cleaned['destination']
         
         # Category validation
-        valid_categories = ['tour', 'hotel', 'restaurant', 'attraction']
-        if metadata_dict.get('category') in valid_categories:
-            cleaned['category'] = metadata_dict['category']
+        if _is_allowed(metadata_dict.get('category'), _VALID_CATEGORIES):
+            cleaned['category'] = sys.intern(metadata_dict['category'])
         
         # Price range validation
-        valid_price_ranges = ['budget', 'moderate', 'expensive', 'luxury']
-        if metadata_dict.get('price_range') in valid_price_ranges:
-            cleaned['price_range'] = metadata_dict['price_range']
+        if _is_allowed(metadata_dict.get('price_range'), _VALID_PRICE_RANGES):
+            cleaned['price_range'] = sys.intern(metadata_dict['price_range'])
         
         # Duration (validate as integer)
         if 'duration_days' in metadata_dict:
@@ -207,25 +582,23 @@ Izvuci metadata u JSON formatu:"""
                 pass
         
         # Transport type validation
-        valid_transport = ['bus', 'plane', 'train', 'ship']
-        if metadata_dict.get('transport_type') in valid_transport:
-            cleaned['transport_type'] = metadata_dict['transport_type']
+        if _is_allowed(metadata_dict.get('transport_type'), _VALID_TRANSPORT):
+            cleaned['transport_type'] = sys.intern(metadata_dict['transport_type'])
         
         # Boolean fields
         if isinstance(metadata_dict.get('family_friendly'), bool):
             cleaned['family_friendly'] = metadata_dict['family_friendly']
         
         # Seasonal validation
-        valid_seasonal = ['year_round', 'summer', 'winter', 'spring', 'autumn']
-        if metadata_dict.get('seasonal') in valid_seasonal:
-            cleaned['seasonal'] = metadata_dict['seasonal']
+        if _is_allowed(metadata_dict.get('seasonal'), _VALID_SEASONAL):
+            cleaned['seasonal'] = sys.intern(metadata_dict['seasonal'])
         
         # Travel month
         if 'travel_month' in metadata_dict and metadata_dict['travel_month']:
-            cleaned['travel_month'] = str(metadata_dict['travel_month']).lower().strip()
+            cleaned['travel_month'] = sys.intern(str(metadata_dict['travel_month']).lower().strip())
         
-        # Price details (keep as JSON string)
-        if 'price_details' in metadata_dict:
+        # Price details (keep as JSON string; the schema sends null when absent)
+        if metadata_dict.get('price_details') is not None:
             cleaned['price_details'] = str(metadata_dict['price_details'])
         
         # Confidence score validation
@@ -239,67 +612,103 @@ Izvuci metadata u JSON formatu:"""
         
         return cleaned
 
+    def _try_cheap_extract(self, content: str, filename: str) -> Optional[DocumentMetadata]:
+        """
+        Rule-based extraction for documents that need no LLM call
+        
+        Only returns metadata when destination, category and transport are all
+        given by the filename, the content states EUR prices and a single trip
+        duration, and travel month and season are unambiguous; otherwise returns
+        None and the LLM path is used, so every field the LLM fills is filled here.
+        """
+        hints = _filename_hints(filename)
+        if not all(hints.get(field) for field in _CHEAP_REQUIRED_HINTS):
+            return None
+        
+        content_lower = content.lower()
+        matches = _PRICE_RE.findall(content_lower)
+        # Price range thresholds assume EUR
+        if not matches or any(unit not in _EUR_UNITS for _, unit in matches):
+            return None
+        durations = {int(days) for days in _DURATION_RE.findall(content_lower)}
+        if len(durations) != 1:
+            return None
+        
+        duration_days = durations.pop()
+        if not 1 <= duration_days <= 30:
+            return None
+        
+        # Underscores are word characters; split them so filename months hit \b
+        text = f"{filename.lower().replace('_', ' ')}\n{content_lower}"
+        if _HOLIDAY_RE.search(text):
+            return None
+        months = {_MONTH_NAMES[first or stem] for first, stem in _MONTH_RE.findall(text)}
+        if len(months) > 1:
+            return None
+        seasons = {match.lastgroup for match in _SEASON_RE.finditer(text)}
+        travel_month = months.pop() if months else None
+        if travel_month:
+            seasons.add(_MONTH_SEASONS[travel_month])
+        if len(seasons) > 1:
+            return None
+        
+        prices = [float(price) for price, _ in matches]
+        return DocumentMetadata(
+            destination=hints['destination'],
+            category=hints['category'],
+            transport_type=hints['transport_type'],
+            duration_days=duration_days,
+            price_range=self._price_range_from_prices(prices),
+            family_friendly=bool(_FAMILY_RE.search(content_lower)),
+            seasonal=seasons.pop() if seasons else 'year_round',
+            travel_month=travel_month,
+            price_details=orjson.dumps({"prices": sorted(set(prices)), "currency": "EUR"}).decode(),
+            source_file=filename,
+            confidence_score=CHEAP_EXTRACTION_CONFIDENCE
+        )
+    
+    def _price_range_from_prices(self, prices: List[float]) -> str:
+        """Bucket the average price (same thresholds as PDFProcessor, assumes EUR)"""
+        avg_price = sum(prices) / len(prices)
+        if avg_price < 50:
+            return "budget"
+        elif avg_price < 150:
+            return "moderate"
+        elif avg_price < 300:
+            return "expensive"
+        return "luxury"
+    
     def _add_filename_based_metadata(self, metadata_dict: Dict[str, Any], filename: str) -> Dict[str, Any]:
         """Add filename-based metadata as fallback/enhancement"""
-        filename_lower = filename.lower()
-        
-        # Destination detection from filename (high priority)
-        filename_destinations = {
-            'amsterdam': 'Amsterdam',
-            'istanbul': 'Istanbul', 
-            'rim': 'Rim',
-            'roma': 'Rim',
-            'rome': 'Rim',
-            'pariz': 'Pariz',
-            'paris': 'Pariz',
-            'romanticna_francuska': 'Pariz',
-            'portugalska': 'Lisabon',
-            'portugal': 'Lisabon',
-            'madrid': 'Madrid',
-            'barcelona': 'Barcelona',
-            'maroko': 'Marakeš',
-            'morocco': 'Marakeš',
-            'malta': 'Malta',
-            'bari': 'Bari',
-            'pulja': 'Pulja'
-        }
+        hints = _filename_hints(filename)
         
         # If destination not found by AI, try filename
-        if not metadata_dict.get('destination'):
-            for keyword, destination in filename_destinations.items():
-                if keyword in filename_lower:
-                    metadata_dict['destination'] = destination
-                    metadata_dict['location'] = destination  # Backward compatibility
-                    break
+        if not metadata_dict.get('destination') and hints.get('destination'):
+            metadata_dict['destination'] = hints['destination']
+            metadata_dict['location'] = hints['destination']  # Backward compatibility
         
         # Transport type from filename
-        if not metadata_dict.get('transport_type'):
-            if 'avio' in filename_lower or 'avion' in filename_lower:
-                metadata_dict['transport_type'] = 'plane'
-            elif 'bus' in filename_lower:
-                metadata_dict['transport_type'] = 'bus'
+        if not metadata_dict.get('transport_type') and hints.get('transport_type'):
+            metadata_dict['transport_type'] = hints['transport_type']
         
         # Category from filename patterns
-        if not metadata_dict.get('category'):
-            if any(word in filename_lower for word in ['cenovnik', 'program', 'putovanja']):
-                metadata_dict['category'] = 'tour'
+        if not metadata_dict.get('category') and hints.get('category'):
+            metadata_dict['category'] = hints['category']
         
         return metadata_dict
 
     def _create_fallback_metadata(self, filename: str) -> DocumentMetadata:
         """Create basic fallback metadata when AI extraction fails"""
         fallback_dict = {
-            'source_file': filename,
-            'confidence_score': 0.1  # Low confidence for fallback
+            'confidence_score': FALLBACK_CONFIDENCE,
+            # Same placeholder as PDFProcessor so the fallback itself cannot fail validation
+            'destination': _filename_hints(filename).get('destination', UNKNOWN_DESTINATION)
         }
-        
-        # Add filename-based metadata
-        fallback_dict = self._add_filename_based_metadata(fallback_dict, filename)
-        
-        return DocumentMetadata(**fallback_dict)
+        return self._metadata_from_dict(fallback_dict, filename)
 
 # Singleton instance
 _metadata_enhancement_service = None
+_metadata_enhancement_service_lock = threading.Lock()
 
 def get_metadata_enhancement_service(openai_client: AsyncOpenAI) -> MetadataEnhancementService:
     """
@@ -307,5 +716,8 @@ def get_metadata_enhancement_service(openai_client: AsyncOpenAI) -> MetadataEnha
     """
     global _metadata_enhancement_service
     if _metadata_enhancement_service is None:
-        _metadata_enhancement_service = MetadataEnhancementService(openai_client)
+        # Double-checked locking so concurrent cold starts build a single instance
+        with _metadata_enhancement_service_lock:
+            if _metadata_enhancement_service is None:
+                _metadata_enhancement_service = MetadataEnhancementService(openai_client)
     return _metadata_enhancement_service 
\ No newline at end of file
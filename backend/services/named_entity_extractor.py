@@ -1,23 +1,175 @@
 import asyncio
-import json
+import hashlib
 import logging
 import re
-from typing import Dict, List, Any, Optional, Tuple
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set, Tuple
 from datetime import datetime
+import numpy as np
+import orjson
 from openai import AsyncOpenAI
+from pydantic import ValidationError
 
-from models.conversation import TourismEntity, EntityExtractionResult
+from models.conversation import TourismEntity, EntityExtractionResult, ExtractedEntities
+from services.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
+# Internal entity representation: entity_type -> (entity_value, confidence).
+# TourismEntity objects are only built for the final merged result.
+RawEntities = Dict[str, Tuple[Any, float]]
+
+# LLM extraction settings
+ENTITY_LLM_MODEL = "gpt-4o-mini"
+ENTITY_PROMPT_VERSION = "v2"
+ENTITY_MAX_TOKENS = 300
+MAX_HISTORY_CONTEXT_CHARS = 800
+
+# Rule-based results that already cover these entities with enough confidence
+# are returned without an LLM call
+RULES_ONLY_ENTITIES = frozenset(["destination", "travel_month", "group_size"])
+RULES_ONLY_MIN_CONFIDENCE = 0.8
+
+# Finished extraction results kept for repeated identical queries; keyed by the
+# message and the last few history turns
+RESULT_CACHE_MAX_ENTRIES = 1024
+RESULT_CACHE_HISTORY_TURNS = 3
+
+# LLM extraction prompt. Only the conversation context varies per call, so the
+# invariant text around it is built once.
+_ENTITY_SYSTEM_PROMPT = "Ti si ekspert za analizu turističkih upita na srpskom jeziku. Izvuci strukturirane informacije iz korisničkih poruka."
+_ENTITY_PROMPT_PREFIX = """
+Analiziraj sledeći turistički upit na srpskom jeziku i izvuci strukturirane informacije.
+
+"""
+_ENTITY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "tourism_entities", "strict": True, "schema": ExtractedEntities.model_json_schema()}
+}
+_ENTITY_PROMPT_SUFFIX = """
+
+Izvuci sledeće informacije (ako postoje):
+1. DESTINACIJA: grad, zemlja ili region
+2. BUDŽET: cena, troškovi (sa valutom)
+3. DATUMI: mesec, sezona, period
+4. GRUPA: broj osoba, tip grupe (porodica, prijatelji)
+5. SMEŠTAJ: tip hotela, kategorija, amenities
+6. TRANSPORT: avion, autobus, voz
+7. AKTIVNOSTI: šta želi da radi
+
+Odgovori u JSON formatu:
+{
+  "destination": "naziv_mesta",
+  "price_max": broj_ili_null,
+  "travel_month": "mesec_ili_null",
+  "group_size": broj_ili_null,
+  "family_friendly": true_ili_false_ili_null,
+  "category": "hotel/apartment/tour",
+  "transport_type": "plane/bus/train/null",
+  "amenities": ["spa", "pool", ...]
+}
+
+Ako informacija ne postoji, stavi null. Budi precizan i koristi standardne nazive.
+"""
+
+# LLM response cache: an exact-hash tier persisted as JSON lines, plus an
+# in-memory semantic tier over message embeddings for paraphrased queries
+ENTITY_CACHE_MAX_ENTRIES = 10_000
+ENTITY_CACHE_PATH = Path(__file__).parent.parent / "cache" / "entity_cache.jsonl"
+SEMANTIC_CACHE_SIZE = 512
+SEMANTIC_SIMILARITY_THRESHOLD = 0.93
+
+# Patterns are compiled once at import instead of being re-parsed per message.
+# The destination prefixes share one alternation, and since messages are
+# lowercased before matching the capitalised-name class is case-insensitive.
+_LOCATION_NAME = r'([A-ZŠĐČĆŽ][a-zšđčćž]+)'
+_DESTINATION_RE = re.compile(r'(?:u|za|do|destinacij[ai])\s+' + _LOCATION_NAME, re.IGNORECASE)
+
+# Price and duration mentions are each found with one scan; the named group
+# that matched classifies the amount (and holds it).
+_PRICE_RE = re.compile(
+    r'do\s+(?P<max_eur>\d+)\s*eur'
+    r'|od\s+(?P<min_eur>\d+)\s*eur'
+    r'|oko\s+(?P<around_eur>\d+)\s*eur'
+    r'|budž[eé]t\s+(?P<budget>\d+)'
+    r'|košta\s+(?P<cost>\d+)'
+    r'|(?P<eur>\d+)\s*(?:eur|€)'
+    r'|(?P<din>\d+)\s*din'
+)
+_DURATION_RE = re.compile(r'(?P<days>\d+)\s*dan|(?P<nights>\d+)\s*no[ćc]')
+
+_PEOPLE_PATTERNS = [re.compile(p) for p in (
+    r'(\d+)\s*osob[ae]',
+    r'za\s+(\d+)',
+    r'(\d+)\s*ljudi',
+    r'(\d+)\s*član'
+)]
+
+# Marker words checked by substring in the rule-based extractors. Frozensets,
+# so each check is one set intersection against the scanned keywords.
+_BUDGET_MARKERS = frozenset(["jeftin", "budget", "ekonom"])
+_LUXURY_MARKERS = frozenset(["luksuz", "skup", "premium"])
+_FAMILY_MARKERS = frozenset(["porodica", "deca", "dete", "familij"])
+_PLANE_MARKERS = frozenset(["avion", "avio", "let"])
+_BUS_MARKERS = frozenset(["autobus", "bus"])
+_TRAIN_MARKERS = frozenset(["voz", "železnic"])
+_ACCOMMODATION_MARKERS = frozenset(["hotel", "apartman", "smeštaj"])
+_PRICE_CONTEXT_MARKERS = frozenset(["maksimal", "minimum"])
+
+# Serbian Latin diacritics folded to ASCII. Vocabulary words are also matched
+# in their folded spelling ("smestaj", "zeleznic", "prolece") and reported
+# under the original word, so extractors need a single check per word.
+_ASCII_FOLD = str.maketrans({"č": "c", "ć": "c", "š": "s", "ž": "z", "đ": "dj"})
+
+def _trie_pattern(words) -> str:
+    """Build a regex that matches the longest of the given words, trie-factored
+    
+    Shared prefixes are merged (e.g. "avi(?:o(?:n)?)"), so the regex engine
+    picks at most one branch per character instead of retrying every keyword
+    at each position - the same goto structure as an Aho-Corasick automaton.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+    
+    return build(trie)
+
 class NamedEntityExtractor:
     """
     Tourism-specific named entity extraction for Serbian language
     Optimized for conversation memory and hybrid context approach
     """
     
-    def __init__(self, openai_client: AsyncOpenAI):
+    def __init__(self, openai_client: AsyncOpenAI, max_llm_concurrency: int = 8,
+                 cache_path: Optional[Path] = ENTITY_CACHE_PATH,
+                 embedding_cache: Optional[EmbeddingCache] = None):
         self.client = openai_client
+        # Message embeddings, shared with other services when one cache is passed in
+        self._embedding_cache = embedding_cache or EmbeddingCache(openai_client)
+        
+        # Shared cap on in-flight LLM calls across all conversations
+        self._llm_sem = asyncio.Semaphore(max_llm_concurrency)
+        
+        # LLM response cache (raw JSON responses keyed by request hash)
+        self._exact_cache: Dict[str, str] = {}
+        self._semantic_cache = deque(maxlen=SEMANTIC_CACHE_SIZE)
+        self._cache_path = cache_path
+        self._load_llm_cache()
+        
+        # Bounded LRU of finished results (copies with this call's timestamps are
+        # handed out, never the cached object)
+        self._result_cache: "OrderedDict[str, EntityExtractionResult]" = OrderedDict()
         
         # Tourism entity categories with Serbian language keywords
         self.tourism_entities = {
@@ -60,6 +212,43 @@ class NamedEntityExtractor:
             }
         }
         
+        # Lowercased location lookups, built once instead of per message
+        locations = self.tourism_entities["destination"]["locations"]
+        self._locations_lower = tuple((location.lower(), location) for location in locations)
+        self._location_by_lower = {}
+        for location_lower, location in self._locations_lower:
+            self._location_by_lower.setdefault(location_lower, location)
+        self._months = tuple(self.tourism_entities["travel_dates"]["months"])
+        self._seasons = tuple(self.tourism_entities["travel_dates"]["seasons"])
+        self._amenities = tuple(
+            (amenity.lower(), amenity) for amenity in self.tourism_entities["preferences"]["amenities"]
+        )
+        # Category word sets: the keyword scan tags a message once, and a category's
+        # list is only walked (for its priority order) when the scan hit one of its words
+        self._date_words = frozenset(self._months + self._seasons)
+        self._amenity_words = frozenset(amenity_lower for amenity_lower, _ in self._amenities)
+        
+        # Every substring keyword goes into one automaton-style regex: a zero-width
+        # lookahead over a trie of keywords reports the longest keyword at each
+        # position, and shorter keywords sharing that start are its prefixes.
+        # Each spelling maps to the word reported in the found set. Location names
+        # get no folded variant ("nis" would match "nisam" or "Tunis").
+        vocabulary = list(self._months) + list(self._seasons)
+        vocabulary.extend(amenity_lower for amenity_lower, _ in self._amenities)
+        for markers in (_BUDGET_MARKERS, _LUXURY_MARKERS, _FAMILY_MARKERS, _PLANE_MARKERS,
+                        _BUS_MARKERS, _TRAIN_MARKERS, _ACCOMMODATION_MARKERS, _PRICE_CONTEXT_MARKERS):
+            vocabulary.extend(markers)
+        spellings = {location_lower: location_lower for location_lower, _ in self._locations_lower}
+        for word in vocabulary:
+            spellings[word] = word
+        for word in vocabulary:
+            spellings.setdefault(word.translate(_ASCII_FOLD), word)
+        self._keyword_re = re.compile("(?=({}))".format(_trie_pattern(spellings)))
+        self._keyword_prefixes = {
+            keyword: frozenset(word for other, word in spellings.items() if keyword.startswith(other))
+            for keyword in spellings
+        }
+        
         logger.info("✅ NamedEntityExtractor initialized with Serbian tourism vocabulary")
     
     async def extract_entities_from_message(self, message: str, conversation_history: Optional[List[str]] = None) -> EntityExtractionResult:
@@ -73,17 +262,31 @@ class NamedEntityExtractor:
         Returns:
             EntityExtractionResult with extracted entities
         """
+        start_time = datetime.now()
+        cache_key = self._get_result_cache_key(message, conversation_history)
+        cached_result = self._result_cache.get(cache_key)
+        if cached_result is not None:
+            self._result_cache.move_to_end(cache_key)
+            # Entities are mentioned again now, and this call's time is the lookup
+            result = cached_result.model_copy(deep=True)
+            for entity in result.entities.values():
+                entity.first_mentioned = entity.last_mentioned = start_time
+            result.processing_time = (datetime.now() - start_time).total_seconds()
+            return result
+        
         try:
-            start_time = datetime.now()
-            
-            # First try rule-based extraction (fast)
-            rule_based_entities = await self._extract_entities_rule_based(message)
-            
-            # Then enhance with LLM extraction (comprehensive)
-            llm_entities = await self._extract_entities_with_llm(message, conversation_history)
+            # Rule-based extraction first (microseconds); the LLM call (comprehensive)
+            # is only made when the rules leave core entities uncovered
+            rule_based_entities = self._extract_entities_rule_based(message)
+            if self._rules_cover_message(rule_based_entities):
+                llm_entities = {}
+                extraction_method = "rules_only"
+            else:
+                llm_entities = await self._extract_entities_with_llm(message, conversation_history)
+                extraction_method = "hybrid"
             
             # Merge results intelligently
-            merged_entities = await self._merge_entity_results(rule_based_entities, llm_entities)
+            merged_entities = self._merge_entity_results(rule_based_entities, llm_entities)
             
             # Calculate processing time
             processing_time = (datetime.now() - start_time).total_seconds()
@@ -91,10 +294,10 @@ class NamedEntityExtractor:
             # Determine confidence based on extraction methods
             confidence = self._calculate_extraction_confidence(rule_based_entities, llm_entities, merged_entities)
             
-            return EntityExtractionResult(
-                entities=merged_entities,
+            result = EntityExtractionResult(
+                entities=self._materialize_entities(merged_entities, start_time),
                 confidence=confidence,
-                extraction_method="hybrid",
+                extraction_method=extraction_method,
                 processing_time=processing_time
             )
             
@@ -106,48 +309,55 @@ class NamedEntityExtractor:
                 extraction_method="failed",
                 processing_time=0.0
             )
+        
+        # Failed extractions are not cached, so a transient error is retried next time
+        self._result_cache[cache_key] = result
+        if len(self._result_cache) > RESULT_CACHE_MAX_ENTRIES:
+            self._result_cache.popitem(last=False)
+        return result.model_copy(deep=True)
+    
+    def _get_result_cache_key(self, message: str, conversation_history: Optional[List[str]]) -> str:
+        """Hash the message together with the recent history turns it is resolved against"""
+        recent_history = conversation_history[-RESULT_CACHE_HISTORY_TURNS:] if conversation_history else []
+        key_text = message + "||" + "||".join(recent_history)
+        return hashlib.blake2b(key_text.encode("utf-8"), digest_size=16).hexdigest()
     
-    async def _extract_entities_rule_based(self, message: str) -> Dict[str, TourismEntity]:
+    def _extract_entities_rule_based(self, message: str) -> RawEntities:
         """Rule-based entity extraction using keywords and patterns"""
         entities = {}
         message_lower = message.lower()
-        timestamp = datetime.now()
         
         try:
+            # Single keyword scan shared by all extractors
+            found = self._scan_keywords(message_lower)
+            
             # Extract destination
-            destination = self._extract_destination(message_lower)
+            destination = self._extract_destination(message_lower, found)
             if destination:
-                entities["destination"] = TourismEntity(
-                    entity_type="destination",
-                    entity_value=destination,
-                    confidence=0.8,
-                    first_mentioned=timestamp,
-                    last_mentioned=timestamp,
-                    frequency=1
-                )
+                entities["destination"] = (destination, 0.8)
             
             # Extract budget/price information
-            budget_info = self._extract_budget(message_lower)
+            budget_info = self._extract_budget(message_lower, found)
             if budget_info:
                 entities.update(budget_info)
             
             # Extract travel dates
-            date_info = self._extract_dates(message_lower)
+            date_info = self._extract_dates(message_lower, found)
             if date_info:
                 entities.update(date_info)
             
             # Extract group composition
-            group_info = self._extract_group_composition(message_lower)
+            group_info = self._extract_group_composition(message_lower, found)
             if group_info:
                 entities.update(group_info)
             
             # Extract accommodation preferences
-            accommodation_info = self._extract_accommodation(message_lower)
+            accommodation_info = self._extract_accommodation(message_lower, found)
             if accommodation_info:
                 entities.update(accommodation_info)
             
             # Extract transport preferences
-            transport_info = self._extract_transport(message_lower)
+            transport_info = self._extract_transport(message_lower, found)
             if transport_info:
                 entities.update(transport_info)
             
@@ -158,33 +368,48 @@ class NamedEntityExtractor:
             logger.error(f"❌ Rule-based extraction failed: {e}")
             return {}
     
-    async def _extract_entities_with_llm(self, message: str, conversation_history: Optional[List[str]] = None) -> Dict[str, TourismEntity]:
+    def _rules_cover_message(self, rule_based: RawEntities) -> bool:
+        """True when rule-based extraction found every core entity with high confidence"""
+        return all(
+            entity_type in rule_based and rule_based[entity_type][1] >= RULES_ONLY_MIN_CONFIDENCE
+            for entity_type in RULES_ONLY_ENTITIES
+        )
+    
+    async def _extract_entities_with_llm(self, message: str, conversation_history: Optional[List[str]] = None) -> RawEntities:
         """LLM-based entity extraction for comprehensive understanding"""
         try:
-            # Prepare context for LLM
-            context_text = ""
-            if conversation_history:
-                context_text = f"Prethodna konverzacija:\n" + "\n".join(conversation_history[-3:]) + f"\n\nTrenutna poruka: {message}"
-            else:
-                context_text = f"Poruka: {message}"
+            # Exact cache hit first, then a semantic match on the message alone.
+            # Paraphrase matching is skipped when prior turns shape the answer.
+            cache_key = self._get_llm_cache_key(message, conversation_history)
+            cached_response = self._exact_cache.get(cache_key)
+            embedding = None
+            if cached_response is None and not conversation_history:
+                embedding = await self._embed_message(message)
+                cached_response = self._semantic_cache_lookup(embedding)
             
-            # Create extraction prompt
-            prompt = self._create_llm_extraction_prompt(context_text)
+            if cached_response is not None:
+                entities = self._parse_llm_entity_response(cached_response)
+                logger.info(f"⚡ LLM extraction cache hit with {len(entities)} entities")
+                return entities
             
-            # Call LLM
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Ti si ekspert za analizu turističkih upita na srpskom jeziku. Izvuci strukturirane informacije iz korisničkih poruka."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=400,
-                temperature=0.1
-            )
+            # Call LLM (structured output, validated against the schema)
+            request = self._build_llm_request(message, conversation_history)
+            llm_response = await self._request_llm_extraction(request)
+            try:
+                extracted = ExtractedEntities.model_validate_json(llm_response)
+            except ValidationError as e:
+                # One retry with the validation error fed back to the model
+                logger.warning(f"⚠️ LLM entity response failed validation, retrying: {e}")
+                request["messages"] = request["messages"] + [
+                    {"role": "assistant", "content": llm_response},
+                    {"role": "user", "content": f"Odgovor nije validan prema JSON šemi: {e}. Pošalji ispravljen JSON."}
+                ]
+                llm_response = await self._request_llm_extraction(request)
+                extracted = ExtractedEntities.model_validate_json(llm_response)
             
-            # Parse LLM response
-            llm_response = response.choices[0].message.content.strip()
-            entities = await self._parse_llm_entity_response(llm_response)
+            entities = self._build_llm_entities(extracted)
+            if entities:
+                self._store_llm_response(cache_key, llm_response, embedding)
             
             logger.info(f"🤖 LLM extraction found {len(entities)} entities")
             return entities
@@ -193,362 +418,291 @@ class NamedEntityExtractor:
             logger.error(f"❌ LLM extraction failed: {e}")
             return {}
     
-    def _extract_destination(self, message: str) -> Optional[str]:
+    async def _request_llm_extraction(self, request: Dict[str, Any]) -> str:
+        """Send an entity extraction request and return the raw response text"""
+        async with self._llm_sem:
+            response = await self.client.chat.completions.create(**request)
+        return response.choices[0].message.content.strip()
+    
+    def _build_llm_request(self, message: str, conversation_history: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build the chat completion request body for LLM entity extraction"""
+        # Prepare context for LLM
+        if conversation_history:
+            context_text = "Prethodna konverzacija:\n" + "\n".join(self._trim_history(conversation_history)) + f"\n\nTrenutna poruka: {message}"
+        else:
+            context_text = f"Poruka: {message}"
+        
+        return {
+            "model": ENTITY_LLM_MODEL,
+            "messages": [
+                {"role": "system", "content": _ENTITY_SYSTEM_PROMPT},
+                {"role": "user", "content": self._create_llm_extraction_prompt(context_text)}
+            ],
+            "response_format": _ENTITY_RESPONSE_FORMAT,
+            "max_tokens": ENTITY_MAX_TOKENS,
+            "temperature": 0
+        }
+    
+    def _trim_history(self, conversation_history: List[str]) -> List[str]:
+        """Last three turns within a character budget, filled from the newest turn back"""
+        budget = MAX_HISTORY_CONTEXT_CHARS
+        turns = []
+        for turn in reversed(conversation_history[-3:]):
+            if budget <= 0:
+                break
+            turns.append(turn[:budget])
+            budget -= len(turn)
+        turns.reverse()
+        return turns
+    
+    def _get_llm_cache_key(self, message: str, conversation_history: Optional[List[str]] = None) -> str:
+        """Hash of everything that determines the LLM extraction response"""
+        history_tail = "|".join(conversation_history[-3:]) if conversation_history else ""
+        raw_key = f"{ENTITY_LLM_MODEL}|{ENTITY_PROMPT_VERSION}|{message}|{history_tail}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+    
+    async def _embed_message(self, message: str) -> Optional[np.ndarray]:
+        """Unit-normalized message embedding for the semantic cache tier"""
+        async with self._llm_sem:
+            return await self._embedding_cache.get(message)
+    
+    def _semantic_cache_lookup(self, embedding: Optional[np.ndarray]) -> Optional[str]:
+        """Return the cached response of the most similar earlier message above the threshold"""
+        if embedding is None:
+            return None
+        
+        best_key = None
+        best_similarity = SEMANTIC_SIMILARITY_THRESHOLD
+        for cached_embedding, cache_key in self._semantic_cache:
+            similarity = float(np.dot(embedding, cached_embedding))
+            if similarity > best_similarity:
+                best_key, best_similarity = cache_key, similarity
+        
+        return self._exact_cache.get(best_key) if best_key else None
+    
+    def _store_llm_response(self, cache_key: str, llm_response: str, embedding: Optional[np.ndarray]):
+        """Write an LLM response to both cache tiers and append it to the replay file"""
+        if cache_key not in self._exact_cache and len(self._exact_cache) >= ENTITY_CACHE_MAX_ENTRIES:
+            self._exact_cache.pop(next(iter(self._exact_cache)))
+        self._exact_cache[cache_key] = llm_response
+        if embedding is not None:
+            self._semantic_cache.append((embedding, cache_key))
+        
+        if self._cache_path is None:
+            return
+        try:
+            with open(self._cache_path, "ab") as cache_file:
+                cache_file.write(orjson.dumps({"key": cache_key, "response": llm_response}) + b"\n")
+        except OSError as e:
+            logger.warning(f"⚠️ Entity cache persistence disabled: {e}")
+            self._cache_path = None
+    
+    def _load_llm_cache(self):
+        """Replay persisted LLM responses into the exact cache"""
+        if self._cache_path is None:
+            return
+        try:
+            self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._cache_path, "rb") as cache_file:
+                lines = cache_file.readlines()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"⚠️ Entity cache persistence disabled: {e}")
+            self._cache_path = None
+            return
+        
+        for line in lines[-ENTITY_CACHE_MAX_ENTRIES:]:
+            try:
+                entry = orjson.loads(line)
+                self._exact_cache[entry["key"]] = entry["response"]
+            except (ValueError, KeyError, TypeError):
+                continue
+        
+        # Compact the replay file once it outgrows the cache
+        if len(lines) > ENTITY_CACHE_MAX_ENTRIES:
+            try:
+                with open(self._cache_path, "wb") as cache_file:
+                    cache_file.writelines(lines[-ENTITY_CACHE_MAX_ENTRIES:])
+            except OSError as e:
+                logger.warning(f"⚠️ Could not compact entity cache: {e}")
+        
+        logger.info(f"📂 Loaded {len(self._exact_cache)} cached LLM entity responses")
+    
+    def _scan_keywords(self, message: str) -> Set[str]:
+        """Return every known keyword that occurs in the message, in one pass"""
+        found = set()
+        for match in self._keyword_re.finditer(message):
+            found.update(self._keyword_prefixes[match.group(1)])
+        return found
+    
+    def _extract_destination(self, message: str, found: Set[str]) -> Optional[str]:
         """Extract destination from message using keyword matching"""
         # Check for explicit location mentions
-        for location in self.tourism_entities["destination"]["locations"]:
-            if location.lower() in message:
+        for location_lower, location in self._locations_lower:
+            if location_lower in found:
                 return location
         
         # Check for location patterns (u + city, za + country)
-        location_patterns = [
-            r'u\s+([A-ZŠĐČĆŽ][a-zšđčćž]+)',
-            r'za\s+([A-ZŠĐČĆŽ][a-zšđčćž]+)',
-            r'do\s+([A-ZŠĐČĆŽ][a-zšđčćž]+)',
-            r'destinacij[ai]\s+([A-ZŠĐČĆŽ][a-zšđčćž]+)'
-        ]
-        
-        for pattern in location_patterns:
-            match = re.search(pattern, message)
-            if match:
-                potential_location = match.group(1)
-                # Validate against known locations
-                for known_location in self.tourism_entities["destination"]["locations"]:
-                    if potential_location.lower() == known_location.lower():
-                        return known_location
+        for match in _DESTINATION_RE.finditer(message):
+            # Validate against known locations
+            known_location = self._location_by_lower.get(match.group(1))
+            if known_location:
+                return known_location
         
         return None
     
-    def _extract_budget(self, message: str) -> Dict[str, TourismEntity]:
+    def _extract_budget(self, message: str, found: Set[str]) -> RawEntities:
         """Extract budget/price information"""
         entities = {}
-        timestamp = datetime.now()
-        
-        # Price patterns
-        price_patterns = [
-            r'(\d+)\s*eur[oa]?',
-            r'(\d+)\s*€',
-            r'do\s+(\d+)\s*eur',
-            r'oko\s+(\d+)\s*eur',
-            r'budž[eé]t\s+(\d+)',
-            r'košta\s+(\d+)',
-            r'(\d+)\s*din'
-        ]
-        
-        for pattern in price_patterns:
-            match = re.search(pattern, message)
-            if match:
-                amount = int(match.group(1))
-                
-                # Determine price type based on context
-                if "do" in match.group(0) or "maksimal" in message:
-                    entities["price_max"] = TourismEntity(
-                        entity_type="price_max",
-                        entity_value=amount,
-                        confidence=0.9,
-                        first_mentioned=timestamp,
-                        last_mentioned=timestamp
-                    )
-                elif "od" in match.group(0) or "minimum" in message:
-                    entities["price_min"] = TourismEntity(
-                        entity_type="price_min", 
-                        entity_value=amount,
-                        confidence=0.9,
-                        first_mentioned=timestamp,
-                        last_mentioned=timestamp
-                    )
-                else:
-                    entities["price_target"] = TourismEntity(
-                        entity_type="price_target",
-                        entity_value=amount,
-                        confidence=0.8,
-                        first_mentioned=timestamp,
-                        last_mentioned=timestamp
-                    )
-                break
+        
+        # Price patterns (single scan, classified by the matched group)
+        match = _PRICE_RE.search(message)
+        if match:
+            amount = int(match.group(match.lastgroup))
+            
+            # Determine price type based on context
+            if match.lastgroup == "max_eur" or "maksimal" in found:
+                entities["price_max"] = (amount, 0.9)
+            elif match.lastgroup == "min_eur" or "minimum" in found:
+                entities["price_min"] = (amount, 0.9)
+            else:
+                entities["price_target"] = (amount, 0.8)
         
         # Price range indicators
-        if any(word in message for word in ["jeftin", "budget", "ekonom"]):
-            entities["price_range"] = TourismEntity(
-                entity_type="price_range",
-                entity_value="budget",
-                confidence=0.7,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
-        elif any(word in message for word in ["luksuz", "skup", "premium"]):
-            entities["price_range"] = TourismEntity(
-                entity_type="price_range",
-                entity_value="luxury",
-                confidence=0.7,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
+        if not _BUDGET_MARKERS.isdisjoint(found):
+            entities["price_range"] = ("budget", 0.7)
+        elif not _LUXURY_MARKERS.isdisjoint(found):
+            entities["price_range"] = ("luxury", 0.7)
         
         return entities
     
-    def _extract_dates(self, message: str) -> Dict[str, TourismEntity]:
+    def _extract_dates(self, message: str, found: Set[str]) -> RawEntities:
         """Extract travel date information"""
         entities = {}
-        timestamp = datetime.now()
-        
-        # Month detection
-        for month in self.tourism_entities["travel_dates"]["months"]:
-            if month in message:
-                entities["travel_month"] = TourismEntity(
-                    entity_type="travel_month",
-                    entity_value=month,
-                    confidence=0.8,
-                    first_mentioned=timestamp,
-                    last_mentioned=timestamp
-                )
-                break
-        
-        # Season detection
-        for season in self.tourism_entities["travel_dates"]["seasons"]:
-            if season in message:
-                entities["travel_season"] = TourismEntity(
-                    entity_type="travel_season",
-                    entity_value=season,
-                    confidence=0.8,
-                    first_mentioned=timestamp,
-                    last_mentioned=timestamp
-                )
-                break
-        
-        # Duration extraction
-        duration_patterns = [
-            r'(\d+)\s*dan[a]?',
-            r'(\d+)\s*noć[i]?',
-            r'(\d+)\s*noc[i]?'
-        ]
         
-        for pattern in duration_patterns:
-            match = re.search(pattern, message)
-            if match:
-                duration = int(match.group(1))
-                if "dan" in match.group(0):
-                    entities["duration_days"] = TourismEntity(
-                        entity_type="duration_days",
-                        entity_value=duration,
-                        confidence=0.9,
-                        first_mentioned=timestamp,
-                        last_mentioned=timestamp
-                    )
-                elif "noć" in match.group(0):
-                    entities["duration_nights"] = TourismEntity(
-                        entity_type="duration_nights",
-                        entity_value=duration,
-                        confidence=0.9,
-                        first_mentioned=timestamp,
-                        last_mentioned=timestamp
-                    )
-                break
+        if not self._date_words.isdisjoint(found):
+            # Month detection
+            for month in self._months:
+                if month in found:
+                    entities["travel_month"] = (month, 0.8)
+                    break
+            
+            # Season detection
+            for season in self._seasons:
+                if season in found:
+                    entities["travel_season"] = (season, 0.8)
+                    break
+        
+        # Duration extraction (single scan, classified by the matched group)
+        match = _DURATION_RE.search(message)
+        if match:
+            duration = int(match.group(match.lastgroup))
+            if match.lastgroup == "days":
+                entities["duration_days"] = (duration, 0.9)
+            else:
+                entities["duration_nights"] = (duration, 0.9)
         
         return entities
     
-    def _extract_group_composition(self, message: str) -> Dict[str, TourismEntity]:
+    def _extract_group_composition(self, message: str, found: Set[str]) -> RawEntities:
         """Extract group composition information"""
         entities = {}
-        timestamp = datetime.now()
         
         # Number of people
-        people_patterns = [
-            r'(\d+)\s*osob[ae]',
-            r'za\s+(\d+)',
-            r'(\d+)\s*ljudi',
-            r'(\d+)\s*član'
-        ]
-        
-        for pattern in people_patterns:
-            match = re.search(pattern, message)
+        for pattern in _PEOPLE_PATTERNS:
+            match = pattern.search(message)
             if match:
                 count = int(match.group(1))
-                entities["group_size"] = TourismEntity(
-                    entity_type="group_size",
-                    entity_value=count,
-                    confidence=0.9,
-                    first_mentioned=timestamp,
-                    last_mentioned=timestamp
-                )
+                entities["group_size"] = (count, 0.9)
                 break
         
         # Family indicators
-        if any(word in message for word in ["porodica", "deca", "dete", "familij"]):
-            entities["family_friendly"] = TourismEntity(
-                entity_type="family_friendly",
-                entity_value=True,
-                confidence=0.8,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
+        if not _FAMILY_MARKERS.isdisjoint(found):
+            entities["family_friendly"] = (True, 0.8)
         
         return entities
     
-    def _extract_accommodation(self, message: str) -> Dict[str, TourismEntity]:
+    def _extract_accommodation(self, message: str, found: Set[str]) -> RawEntities:
         """Extract accommodation preferences"""
         entities = {}
-        timestamp = datetime.now()
         
         # Hotel category
-        if "hotel" in message:
-            entities["category"] = TourismEntity(
-                entity_type="category",
-                entity_value="hotel",
-                confidence=0.9,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
-        elif "apartman" in message:
-            entities["category"] = TourismEntity(
-                entity_type="category",
-                entity_value="apartment",
-                confidence=0.9,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
-        elif "smeštaj" in message or "smestaj" in message:
-            entities["category"] = TourismEntity(
-                entity_type="category",
-                entity_value="accommodation",
-                confidence=0.8,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
+        if "hotel" in found:
+            entities["category"] = ("hotel", 0.9)
+        elif "apartman" in found:
+            entities["category"] = ("apartment", 0.9)
+        elif "smeštaj" in found:
+            entities["category"] = ("accommodation", 0.8)
         
         # Amenities
         amenities = []
-        for amenity in self.tourism_entities["preferences"]["amenities"]:
-            if amenity.lower() in message:
-                amenities.append(amenity)
+        if not self._amenity_words.isdisjoint(found):
+            amenities = [amenity for amenity_lower, amenity in self._amenities if amenity_lower in found]
         
         if amenities:
-            entities["amenities"] = TourismEntity(
-                entity_type="amenities",
-                entity_value=amenities,
-                confidence=0.7,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
+            entities["amenities"] = (amenities, 0.7)
         
         return entities
     
-    def _extract_transport(self, message: str) -> Dict[str, TourismEntity]:
+    def _extract_transport(self, message: str, found: Set[str]) -> RawEntities:
         """Extract transport preferences"""
         entities = {}
-        timestamp = datetime.now()
-        
-        if any(word in message for word in ["avion", "avio", "let"]):
-            entities["transport_type"] = TourismEntity(
-                entity_type="transport_type",
-                entity_value="plane",
-                confidence=0.9,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
-        elif any(word in message for word in ["autobus", "bus"]):
-            entities["transport_type"] = TourismEntity(
-                entity_type="transport_type",
-                entity_value="bus",
-                confidence=0.9,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
-        elif any(word in message for word in ["voz", "železnic"]):
-            entities["transport_type"] = TourismEntity(
-                entity_type="transport_type",
-                entity_value="train",
-                confidence=0.9,
-                first_mentioned=timestamp,
-                last_mentioned=timestamp
-            )
+        
+        if not _PLANE_MARKERS.isdisjoint(found):
+            entities["transport_type"] = ("plane", 0.9)
+        elif not _BUS_MARKERS.isdisjoint(found):
+            entities["transport_type"] = ("bus", 0.9)
+        elif not _TRAIN_MARKERS.isdisjoint(found):
+            entities["transport_type"] = ("train", 0.9)
         
         return entities
     
     def _create_llm_extraction_prompt(self, context_text: str) -> str:
         """Create prompt for LLM entity extraction"""
-        return f"""
-Analiziraj sledeći turistički upit na srpskom jeziku i izvuci strukturirane informacije.
-
-{context_text}
-
-Izvuci sledeće informacije (ako postoje):
-1. DESTINACIJA: grad, zemlja ili region
-2. BUDŽET: cena, troškovi (sa valutom)
-3. DATUMI: mesec, sezona, period
-4. GRUPA: broj osoba, tip grupe (porodica, prijatelji)
-5. SMEŠTAJ: tip hotela, kategorija, amenities
-6. TRANSPORT: avion, autobus, voz
-7. AKTIVNOSTI: šta želi da radi
-
-Odgovori u JSON formatu:
-{{
-  "destination": "naziv_mesta",
-  "price_max": broj_ili_null,
-  "travel_month": "mesec_ili_null",
-  "group_size": broj_ili_null,
-  "family_friendly": true_ili_false_ili_null,
-  "category": "hotel/apartment/tour",
-  "transport_type": "plane/bus/train/null",
-  "amenities": ["spa", "pool", ...]
-}}
-
-Ako informacija ne postoji, stavi null. Budi precizan i koristi standardne nazive.
-"""
+        return _ENTITY_PROMPT_PREFIX + context_text + _ENTITY_PROMPT_SUFFIX
     
-    async def _parse_llm_entity_response(self, llm_response: str) -> Dict[str, TourismEntity]:
-        """Parse LLM JSON response into TourismEntity objects"""
-        entities = {}
-        timestamp = datetime.now()
-        
+    def _parse_llm_entity_response(self, llm_response: str) -> RawEntities:
+        """Parse LLM JSON response into raw (value, confidence) entities"""
         try:
-            # Clean and parse JSON
-            json_text = llm_response.strip()
-            if json_text.startswith("```json"):
-                json_text = json_text.replace("```json", "").replace("```", "").strip()
-            
-            parsed_data = json.loads(json_text)
-            
-            # Convert to TourismEntity objects
-            for entity_type, entity_value in parsed_data.items():
-                if entity_value is not None and entity_value != "":
-                    entities[entity_type] = TourismEntity(
-                        entity_type=entity_type,
-                        entity_value=entity_value,
-                        confidence=0.8,  # LLM extraction confidence
-                        first_mentioned=timestamp,
-                        last_mentioned=timestamp,
-                        frequency=1
-                    )
-            
-            return entities
-            
+            return self._build_llm_entities(ExtractedEntities.model_validate_json(llm_response))
         except Exception as e:
             logger.error(f"❌ Failed to parse LLM entity response: {e}")
             return {}
     
-    async def _merge_entity_results(self, rule_based: Dict[str, TourismEntity], 
-                                   llm_based: Dict[str, TourismEntity]) -> Dict[str, TourismEntity]:
+    def _build_llm_entities(self, extracted: ExtractedEntities) -> RawEntities:
+        """Convert validated LLM output into raw (value, confidence) entities"""
+        return {
+            entity_type: (entity_value, 0.8)  # LLM extraction confidence
+            for entity_type, entity_value in extracted.model_dump().items()
+            if entity_value is not None and entity_value != ""
+        }
+    
+    def _merge_entity_results(self, rule_based: RawEntities, llm_based: RawEntities) -> RawEntities:
         """Intelligently merge rule-based and LLM-based entity extraction results"""
-        merged = {}
-        
         # Start with rule-based entities (higher precision)
-        for entity_type, entity in rule_based.items():
-            merged[entity_type] = entity
+        merged = dict(rule_based)
         
         # Add LLM entities that don't conflict or have higher confidence
         for entity_type, llm_entity in llm_based.items():
-            if entity_type not in merged:
-                # Add new entity from LLM
+            existing_entity = merged.get(entity_type)
+            if existing_entity is None or llm_entity[1] > existing_entity[1]:
                 merged[entity_type] = llm_entity
-            else:
-                # Choose entity with higher confidence
-                existing_entity = merged[entity_type]
-                if llm_entity.confidence > existing_entity.confidence:
-                    merged[entity_type] = llm_entity
         
         return merged
     
+    def _materialize_entities(self, entities: RawEntities, timestamp: datetime) -> Dict[str, TourismEntity]:
+        """Build the public TourismEntity objects for the final merged result"""
+        return {
+            entity_type: TourismEntity(
+                entity_type=entity_type,
+                entity_value=entity_value,
+                confidence=confidence,
+                first_mentioned=timestamp
+            )
+            for entity_type, (entity_value, confidence) in entities.items()
+        }
+    
     def _calculate_extraction_confidence(self, rule_based: Dict, llm_based: Dict, merged: Dict) -> float:
         """Calculate overall extraction confidence"""
         if not merged:
@@ -557,8 +711,8 @@ Ako informacija ne postoji, stavi null. Budi precizan i koristi standardne naziv
         total_confidence = 0.0
         entity_count = len(merged)
         
-        for entity in merged.values():
-            total_confidence += entity.confidence
+        for _, confidence in merged.values():
+            total_confidence += confidence
         
         average_confidence = total_confidence / entity_count
         
@@ -0,0 +1,47 @@
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+from openai import AsyncOpenAI
+
+# Keep-alive connection pool; HTTP/2 multiplexes concurrent calls over one socket
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30.0)
+
+def create_async_openai_client() -> AsyncOpenAI:
+    """
+    Create an AsyncOpenAI client on its own pooled HTTP/2 connection pool
+    
+    Pooled connections belong to the event loop that opened them, so the client
+    must only be used from one loop; see loop_bound_client for asyncio.run code.
+    """
+    http_client = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+@asynccontextmanager
+async def loop_bound_client(client: AsyncOpenAI) -> AsyncIterator[AsyncOpenAI]:
+    """
+    Copy of client on a connection pool owned by the running event loop
+    
+    For code that drives its own event loop (asyncio.run during PDF processing):
+    reusing one pooled client in a later asyncio.run fails with "Event loop is
+    closed". The copy keeps the client's settings and its pool is closed on exit.
+    """
+    async with httpx.AsyncClient(http2=True, limits=HTTP_LIMITS) as http_client:
+        yield client.copy(http_client=http_client)
+
+# Singleton instance
+_async_openai_client = None
+_async_openai_client_lock = threading.Lock()
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Get the process-wide AsyncOpenAI client used on the server event loop
+    """
+    global _async_openai_client
+    if _async_openai_client is None:
+        with _async_openai_client_lock:
+            if _async_openai_client is None:
+                _async_openai_client = create_async_openai_client()
+    return _async_openai_client
@@ -1,168 +1,593 @@
 import pdfplumber
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+import os
 import re
-from typing import List, Dict, Any, Tuple
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 from pathlib import Path
 import hashlib
+from multiprocessing import get_context
 from datetime import datetime
 from openai import AsyncOpenAI
 import asyncio
 import logging
 
 from models.document import DocumentChunk, DocumentMetadata, ProcessedDocument
-from services.metadata_enhancement_service import MetadataEnhancementService
+from services.metadata_enhancement_service import FALLBACK_CONFIDENCE, MetadataEnhancementService
+from services.openai_client import loop_bound_client
 
 # Configure detailed logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Batch processing can split page text/table extraction (pdfplumber layout
+# analysis is CPU-bound) across worker processes. Opt-in: the pool is spawned,
+# not forked, since the server process runs threads, and spawned workers
+# re-import the caller's __main__ module, so the entry script must keep its
+# work under an `if __name__ == "__main__":` guard (main.py builds every service
+# at import; serve it with `uvicorn main:app` before raising this). With the
+# default of 1, and for single uploads, pages are extracted in-process.
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "1"))
+
+# Page text extractor. "pdfplumber" (default) extracts text and tables with
+# pdfplumber; "pdfium" takes page text from PDFium (C++, much faster than
+# pdfminer's pure-Python layout analysis) and only opens pages that may hold a
+# table with pdfplumber. The two produce different text, so chunks extracted
+# with PDFium get their own chunk ids (see _generate_chunk_ids).
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "pdfplumber")
+
+# PDFium is not thread-safe, not even across separate documents, and uploads
+# are processed on several threads; every PDFium call holds this lock
+_PDFIUM_LOCK = threading.Lock()
+
+# Processed documents cached on disk, keyed by file content, filename and processing
+# settings; bump the version when extraction or chunking output changes
+PROCESSED_CACHE_DIR = Path(__file__).parent.parent / "cache" / "processed_pdfs"
+PROCESSED_CACHE_VERSION = "v1"
+
+# Maximum GPT-4o-mini metadata calls in flight while enhancing a document's chunks
+METADATA_CONCURRENCY = 10
+
+# Sentence/paragraph boundary used for chunking
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]\s+')
+
+# Precompiled price pattern (€, $, RSD), applied to lowercased text
+_PRICE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:€|eur|usd|\$|rsd|din)')
+
+# Fallback metadata keywords, matched as substrings of the lowercased chunk text.
+# Categories and seasons are listed in priority order.
+_CATEGORY_KEYWORDS = (
+    # Priority triggers - if mentioned, automatically assign category
+    ("tour", ("aranžman", "tura", "program putovanja", "itinerar")),
+    ("restaurant", ("menu", "karta", "specijaliteti", "kuhinja")),
+    ("attraction", ("ulaznica", "radno vreme", "poseta", "obilazak")),
+    # Fallback to simple detection for hotel (most common)
+    ("hotel", ("hotel", "smeštaj", "apartman", "vila")),
+)
+_FAMILY_KEYWORDS = ("porodica", "deca", "family", "family-friendly", "pogodno za decu")
+_SEASON_KEYWORDS = (
+    ("summer", ("leto", "summer", "jun", "jul", "avgust")),
+    ("winter", ("zima", "winter", "decembar", "januar", "februar")),
+    ("spring", ("proleće", "spring", "mart", "april", "maj")),
+    ("autumn", ("jesen", "autumn", "septembar", "oktobar", "novembar")),
+)
+# Flattened (word, season) pairs in season priority order: the first word found
+# belongs to the highest-priority season present, so one loop with one exit
+_SEASON_WORDS = tuple((word, season) for season, words in _SEASON_KEYWORDS for word in words)
+
+# Major cities and regions for text-based location detection
+_TEXT_LOCATIONS = {
+    'beograd': 'Beograd',
+    'novi sad': 'Novi Sad',
+    'niš': 'Niš',
+    'kragujevac': 'Kragujevac',
+    'rim': 'Rim',
+    'rim ': 'Rim',
+    'roma': 'Rim',
+    'pariz': 'Pariz',
+    'berlin': 'Berlin',
+    'beč': 'Beč',
+    'vienna': 'Beč',
+    'prag': 'Prag',
+    'budimpešta': 'Budimpešta',
+    'istanbul': 'Istanbul',
+    'atina': 'Atina',
+    'solun': 'Solun',
+    'barcelona': 'Barcelona',
+    'madrid': 'Madrid',
+    'london': 'London',
+    'amsterdam': 'Amsterdam',
+    'kopaonik': 'Kopaonik',
+    'zlatibor': 'Zlatibor',
+    'tara': 'Tara',
+    'fruška gora': 'Fruška Gora'
+}
+# Common departure cities that appear in travel documents
+_DEPARTURE_CITIES = frozenset(['beograd', 'novi sad', 'niš'])
+
+# Specific filename patterns for exact matching (HIGHEST PRIORITY)
+_FILENAME_LOCATIONS = {
+    # French destinations
+    'romanticna_francuska': 'Pariz',
+    'francuska': 'Pariz',
+    'pariz': 'Pariz',
+    'france': 'Pariz',
+    
+    # Portuguese destinations  
+    'portugalska': 'Lisabon',
+    'portugal': 'Lisabon',
+    'lisabon': 'Lisabon',
+    'porto': 'Porto',
+    
+    # Italian destinations
+    'rim_': 'Rim',
+    'roma': 'Rim',
+    'italy': 'Rim',
+    'italija': 'Rim',
+    'toskana': 'Firenca',
+    'sicilija': 'Palermo',
+    'bari': 'Bari',
+    'pulja': 'Bari',
+    
+    # Turkish destinations
+    'istanbul': 'Istanbul',
+    'turska': 'Istanbul',
+    'turkey': 'Istanbul',
+    'kabadokija': 'Istanbul',
+    
+    # Dutch destinations
+    'amsterdam': 'Amsterdam',
+    'holland': 'Amsterdam',
+    'netherlands': 'Amsterdam',
+    
+    # Spanish destinations
+    'madrid': 'Madrid',
+    'barcelona': 'Barcelona',
+    'andaluzija': 'Sevilla',
+    'spain': 'Madrid',
+    
+    # Greek destinations
+    'grcka': 'Atina',
+    'greece': 'Atina',
+    'atina': 'Atina',
+    
+    # German destinations
+    'nemacka': 'Berlin',
+    'germany': 'Berlin',
+    'minhen': 'Minhen',
+    'munich': 'Minhen',
+    
+    # Serbian destinations
+    'beograd': 'Beograd',
+    'novi_sad': 'Novi Sad',
+    'kopaonik': 'Kopaonik',
+    'zlatibor': 'Zlatibor',
+    'tara': 'Tara',
+    
+    # Other destinations
+    'maroko': 'Kazablanka',
+    'morocco': 'Kazablanka',
+    'egipat': 'Kairo',
+    'egypt': 'Kairo',
+    'indija': 'Deli',
+    'india': 'Deli',
+    'kina': 'Peking',
+    'china': 'Peking',
+    'rusija': 'Moskva',
+    'russia': 'Moskva',
+    'sankt_petersburg': 'Sankt Peterburg',
+    'moskva': 'Moskva'
+}
+
+# Filename keys in priority order: the specific patterns, then generic location
+# names (except Beograd, usually the departure city); earlier entries win
+_FILENAME_LOCATION_KEYS = {
+    **_FILENAME_LOCATIONS,
+    **{key: value for key, value in _TEXT_LOCATIONS.items() if key != 'beograd' and key not in _FILENAME_LOCATIONS}
+}
+_FILENAME_LOCATION_RANK = {key: i for i, key in enumerate(_FILENAME_LOCATION_KEYS)}
+
+# Zero-width lookahead so keys starting at every position are reported in one pass
+_FILENAME_LOCATION_RE = re.compile(r"(?=({}))".format("|".join(re.escape(key) for key in _FILENAME_LOCATION_KEYS)))
+
+@lru_cache(maxsize=1024)
+def _location_from_filename(filename: str) -> Optional[str]:
+    """Location named by the filename, from a single regex pass
+    
+    Memoized because every chunk of a PDF shares the same filename.
+    """
+    keys = [match.group(1) for match in _FILENAME_LOCATION_RE.finditer(filename.lower())]
+    if not keys:
+        return None
+    return _FILENAME_LOCATION_KEYS[min(keys, key=_FILENAME_LOCATION_RANK.__getitem__)]
+
+def _format_table(table: List[List[str]]) -> str:
+    """Format extracted table data"""
+    if not table:
+        return ""
+    
+    # pdfplumber cells are strings or None; empty rows are skipped
+    return "\n".join(" | ".join(cell or "" for cell in row) for row in table if row)
+
+def _may_contain_table(page) -> bool:
+    """Cheap pre-check for extract_tables()
+    
+    The default "lines" table strategy builds cells from ruling edges, so a page
+    needs at least two horizontal and two vertical edges to hold any table. Most
+    text-only brochure pages have none and skip table detection entirely.
+    """
+    orientations = [edge["orientation"] for edge in page.edges]
+    return orientations.count("h") >= 2 and orientations.count("v") >= 2
+
+def _iter_page_parts(pages, first_page_num: int) -> Iterator[str]:
+    """Text pieces (page header, page text, formatted tables) of consecutive pages"""
+    for page_num, page in enumerate(pages, first_page_num):
+        yield f"\n\n--- Strana {page_num + 1} ---\n\n"
+        yield page.extract_text() or ""
+        
+        # Extract tables if present
+        page_tables = page.extract_tables() if _may_contain_table(page) else []
+        if page_tables:
+            for table in page_tables:
+                yield "\n\nTabela:\n"
+                yield _format_table(table)
+                yield "\n"
+
+def _iter_pdfium_page_parts(file_path: str, start: int, stop: int) -> Iterator[str]:
+    """Text pieces of pages [start, stop), text via PDFium and tables via pdfplumber
+    
+    Tables are built from ruling edges, i.e. path objects, so only pages with at
+    least one path object are handed to pdfplumber for table extraction.
+    """
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(file_path)
+    plumber_pdf = None
+    try:
+        for page_num in range(start, stop):
+            # The lock is released before yielding, so a suspended generator never holds it
+            with _PDFIUM_LOCK:
+                page = pdf[page_num]
+                textpage = page.get_textpage()
+                text = textpage.get_text_bounded().replace("\r\n", "\n")
+                textpage.close()
+                has_paths = any(True for _ in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_PATH,)))
+                page.close()
+            
+            yield f"\n\n--- Strana {page_num + 1} ---\n\n"
+            yield text
+            if not has_paths:
+                continue
+            
+            if plumber_pdf is None:
+                plumber_pdf = pdfplumber.open(file_path)
+            plumber_page = plumber_pdf.pages[page_num]
+            page_tables = plumber_page.extract_tables() if _may_contain_table(plumber_page) else []
+            for table in page_tables:
+                yield "\n\nTabela:\n"
+                yield _format_table(table)
+                yield "\n"
+    finally:
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+        with _PDFIUM_LOCK:
+            pdf.close()
+
+def _page_count(file_path: str) -> int:
+    """Number of pages in the PDF"""
+    if PDF_TEXT_BACKEND == "pdfplumber":
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Worker process entry point: extract pages [start, stop) of the PDF"""
+    if PDF_TEXT_BACKEND == "pdfplumber":
+        with pdfplumber.open(file_path) as pdf:
+            return list(_iter_page_parts(pdf.pages[start:stop], start))
+    return list(_iter_pdfium_page_parts(file_path, start, stop))
+
+def _iter_sentences(segments: Iterable[str]) -> Iterator[str]:
+    """Split streamed text by sentences and paragraphs
+    
+    Only the trailing, possibly unfinished sentence is carried into the next
+    segment, so a sentence spanning a page boundary is still split correctly.
+    """
+    pending = ""
+    for segment in segments:
+        pieces = _SENTENCE_SPLIT_RE.split(pending + segment)
+        pending = pieces.pop()
+        yield from pieces
+    yield pending
+
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split pages into one contiguous [start, stop) range per worker"""
+    pages_per_worker = max(1, -(-page_count // workers))
+    return [(start, min(start + pages_per_worker, page_count)) for start in range(0, page_count, pages_per_worker)]
+
 class PDFProcessor:
     """Service for processing PDF documents into searchable chunks with enhanced metadata"""
     
-    def __init__(self, chunk_size: int = 1024, chunk_overlap: int = 200, openai_client: AsyncOpenAI = None):
+    def __init__(self, chunk_size: int = 1024, chunk_overlap: int = 200, openai_client: AsyncOpenAI = None,
+                 cache_dir: Optional[Path] = PROCESSED_CACHE_DIR):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.metadata_service = MetadataEnhancementService(openai_client) if openai_client else None
+        self.cache_dir = cache_dir
         
     def process_pdf(self, file_path: str) -> ProcessedDocument:
         """Process a PDF file and return structured document data"""
         try:
             filename = Path(file_path).name
             logger.info(f"🔄 Processing PDF: {filename}")
-            chunks = []
-            
-            with pdfplumber.open(file_path) as pdf:
-                full_text = ""
-                tables = []
-                
-                # Extract text and tables from all pages
-                for page_num, page in enumerate(pdf.pages):
-                    page_text = page.extract_text() or ""
-                    full_text += f"\n\n--- Strana {page_num + 1} ---\n\n" + page_text
-                    
-                    # Extract tables if present
-                    page_tables = page.extract_tables()
-                    if page_tables:
-                        for table in page_tables:
-                            table_text = self._format_table(table)
-                            full_text += f"\n\nTabela:\n{table_text}\n"
             
-            logger.info(f"📄 Extracted {len(full_text)} characters from {filename}")
+            # Unchanged files skip extraction, chunking and metadata entirely
+            cache_key = self._get_document_cache_key(file_path)
+            cached_document = self._load_cached_document(cache_key)
+            if cached_document is not None:
+                logger.info(f"♻️ Using cached processing result for {filename}")
+                return cached_document
             
-            # Create chunks from the extracted text
-            text_chunks = self._create_chunks(full_text)
+            # Create chunks while pages are extracted; the full text is never held in memory
+            text_chunks = self._create_chunks(self._iter_text_parts(file_path))
             logger.info(f"📊 Created {len(text_chunks)} chunks from {filename}")
             
-            # Process each chunk with enhanced metadata
-            for i, chunk_text in enumerate(text_chunks):
-                logger.info(f"🧠 Processing chunk {i+1}/{len(text_chunks)} for {filename}")
-                
-                if self.metadata_service:
-                    # Use enhanced metadata service (async)
-                    logger.info(f"🤖 Calling GPT-4o-mini for metadata extraction...")
-                    metadata = asyncio.run(self.metadata_service.enhance_document_metadata(chunk_text, filename))
-                    logger.info(f"✅ GPT-4o-mini response: destination={metadata.destination}, category={metadata.category}")
-                else:
-                    # Fallback to basic metadata extraction
-                    logger.info(f"📝 Using fallback metadata extraction...")
-                    metadata = self._extract_metadata_fallback(chunk_text, filename)
-                
-                chunk = DocumentChunk(
-                    id=self._generate_chunk_id(filename, i),
-                    text=chunk_text.strip(),
-                    metadata=metadata,
-                    created_at=datetime.now()
-                )
-                chunks.append(chunk)
-                logger.info(f"✅ Created chunk {chunk.id} with source_file={metadata.source_file}")
+            # Process all chunks with enhanced metadata
+            metadata_list = self._extract_metadata_many([(chunk_text, filename) for chunk_text in text_chunks])
             
-            logger.info(f"🎉 Successfully processed {filename}: {len(chunks)} chunks created")
-            return ProcessedDocument(
-                filename=filename,
-                chunks=chunks,
-                total_chunks=len(chunks),
-                processing_status="success",
-                processed_at=datetime.now()
-            )
+            processed_document = self._build_processed_document(filename, text_chunks, metadata_list)
+            self._store_cached_document(cache_key, processed_document)
+            return processed_document
             
         except Exception as e:
-            logger.error(f"❌ Error processing {filename}: {e}")
-            return ProcessedDocument(
-                filename=Path(file_path).name,
-                chunks=[],
-                total_chunks=0,
-                processing_status="error",
-                error_message=str(e),
-                processed_at=datetime.now()
+            return self._failed_document(file_path, e)
+    
+    def process_pdfs_batch(self, file_paths: List[str]) -> List[ProcessedDocument]:
+        """
+        Process many PDF files with one shared worker pool
+        
+        Page ranges of all files are submitted to the pool before any result is
+        awaited, and the chunks of all files get their metadata in one event loop.
+        With fewer than two workers the pages are extracted in-process.
+        
+        Args:
+            file_paths: PDF files to process
+            
+        Returns:
+            ProcessedDocument list in the same order as file_paths
+        """
+        if not file_paths:
+            return []
+        
+        logger.info(f"🔄 Processing {len(file_paths)} PDFs in one batch")
+        workers = max(1, min(PDF_EXTRACT_WORKERS, os.cpu_count() or 1))
+        results: List[Optional[ProcessedDocument]] = [None] * len(file_paths)
+        chunked_files: List[Tuple[int, str, List[str]]] = []
+        cache_keys: Dict[int, str] = {}
+        
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) if workers >= 2 else nullcontext()
+        with pool as executor:
+            pending = []
+            for index, file_path in enumerate(file_paths):
+                try:
+                    cache_keys[index] = self._get_document_cache_key(file_path)
+                    cached_document = self._load_cached_document(cache_keys[index])
+                    if cached_document is not None:
+                        results[index] = cached_document
+                        continue
+                    
+                    futures = None
+                    if executor is not None:
+                        futures = [executor.submit(_extract_page_range, file_path, start, stop)
+                                   for start, stop in _page_ranges(_page_count(file_path), workers)]
+                    pending.append((index, file_path, futures))
+                except Exception as e:
+                    results[index] = self._failed_document(file_path, e)
+            
+            for index, file_path, futures in pending:
+                try:
+                    if futures is None:
+                        text_parts = self._iter_text_parts(file_path)
+                    else:
+                        text_parts = (part for future in futures for part in future.result())
+                    chunked_files.append((index, Path(file_path).name, self._create_chunks(text_parts)))
+                except Exception as e:
+                    results[index] = self._failed_document(file_path, e)
+        
+        documents = [(chunk_text, filename) for _, filename, text_chunks in chunked_files for chunk_text in text_chunks]
+        logger.info(f"📊 Created {len(documents)} chunks from {len(chunked_files)} PDFs")
+        metadata_list = self._extract_metadata_many(documents)
+        
+        position = 0
+        for index, filename, text_chunks in chunked_files:
+            file_metadata = metadata_list[position:position + len(text_chunks)]
+            position += len(text_chunks)
+            results[index] = self._build_processed_document(filename, text_chunks, file_metadata)
+            self._store_cached_document(cache_keys[index], results[index])
+        
+        successful = sum(1 for result in results if result.processing_status == "success")
+        logger.info(f"🎉 Batch processing complete: {successful}/{len(file_paths)} PDFs processed successfully")
+        return results
+    
+    def _get_document_cache_key(self, file_path: str) -> str:
+        """Hash the file content together with everything that shapes the result"""
+        with open(file_path, "rb") as pdf_file:
+            digest = hashlib.file_digest(pdf_file, hashlib.blake2b)
+        metadata_mode = "llm" if self.metadata_service else "rules"
+        digest.update(
+            f"|{PROCESSED_CACHE_VERSION}|{PDF_TEXT_BACKEND}|{Path(file_path).name}|{self.chunk_size}|{self.chunk_overlap}|{metadata_mode}".encode("utf-8")
+        )
+        return digest.hexdigest()[:32]
+    
+    def _load_cached_document(self, cache_key: str) -> Optional[ProcessedDocument]:
+        """Load a cached processing result, if there is one"""
+        if self.cache_dir is None:
+            return None
+        
+        try:
+            return ProcessedDocument.model_validate_json((self.cache_dir / f"{cache_key}.json").read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Failed to read processed document cache entry: {e}")
+            return None
+    
+    def _store_cached_document(self, cache_key: str, processed_document: ProcessedDocument):
+        """Persist a successful processing result (written to a temp file, then renamed)"""
+        if self.cache_dir is None:
+            return
+        
+        # Chunks that fell back after a failed LLM call are retried on the next run
+        if any(chunk.metadata.confidence_score == FALLBACK_CONFIDENCE for chunk in processed_document.chunks):
+            return
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_file = self.cache_dir / f"{cache_key}.json"
+            temp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            temp_file.write_text(processed_document.model_dump_json(), encoding="utf-8")
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to write processed document cache entry: {e}")
+    
+    def _build_processed_document(self, filename: str, text_chunks: List[str],
+                                  metadata_list: List[DocumentMetadata]) -> ProcessedDocument:
+        """Assemble chunks and their metadata into a successful ProcessedDocument"""
+        chunks = []
+        chunk_ids = self._generate_chunk_ids(filename, len(text_chunks))
+        for chunk_id, chunk_text, metadata in zip(chunk_ids, text_chunks, metadata_list):
+            chunk = DocumentChunk(
+                id=chunk_id,
+                text=chunk_text.strip(),
+                metadata=metadata,
+                created_at=datetime.now()
             )
+            chunks.append(chunk)
+        
+        # One summary line per document; per-chunk lines were formatted for every chunk
+        logger.info(f"🎉 Successfully processed {filename}: {len(chunks)} chunks created")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Chunk ids for {filename}: {[chunk.id for chunk in chunks]}")
+        return ProcessedDocument(
+            filename=filename,
+            chunks=chunks,
+            total_chunks=len(chunks),
+            processing_status="success",
+            processed_at=datetime.now()
+        )
+    
+    def _failed_document(self, file_path: str, error: Exception) -> ProcessedDocument:
+        """Build the error result for a PDF that could not be processed"""
+        filename = Path(file_path).name
+        logger.error(f"❌ Error processing {filename}: {error}")
+        return ProcessedDocument(
+            filename=filename,
+            chunks=[],
+            total_chunks=0,
+            processing_status="error",
+            error_message=str(error),
+            processed_at=datetime.now()
+        )
     
-    def _create_chunks(self, text: str) -> List[str]:
-        """Split text into overlapping chunks"""
+    def _iter_text_parts(self, file_path: str) -> Iterator[str]:
+        """Extract text and tables from all pages, streamed in page order"""
+        if PDF_TEXT_BACKEND == "pdfplumber":
+            with pdfplumber.open(file_path) as pdf:
+                yield from _iter_page_parts(pdf.pages, 0)
+        else:
+            yield from _iter_pdfium_page_parts(file_path, 0, _page_count(file_path))
+    
+    def _create_chunks(self, text: Union[str, Iterable[str]]) -> List[str]:
+        """Split text (a string, or text segments streamed in order) into overlapping chunks"""
         # Split by sentences and paragraphs
-        sentences = re.split(r'[.!?]\s+', text)
+        sentences = _iter_sentences([text] if isinstance(text, str) else text)
         
         chunks = []
-        current_chunk = ""
+        # The chunk being built: its sentences (joined with spaces on flush) and
+        # its words, so the size check and the overlap never re-split the buffer
+        current_parts: List[str] = []
+        current_words: List[str] = []
         
         for sentence in sentences:
             sentence = sentence.strip()
             if not sentence:
                 continue
+            sentence_words = sentence.split()
                 
             # Check if adding this sentence would exceed chunk size
-            potential_chunk = current_chunk + " " + sentence if current_chunk else sentence
-            
-            if len(potential_chunk.split()) > self.chunk_size:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
+            if len(current_words) + len(sentence_words) > self.chunk_size:
+                if current_parts:
+                    chunks.append(" ".join(current_parts).strip())
                     
                     # Start new chunk with overlap
-                    overlap_words = current_chunk.split()[-self.chunk_overlap:]
-                    current_chunk = " ".join(overlap_words) + " " + sentence
+                    overlap_words = current_words[-self.chunk_overlap:]
+                    current_parts = [" ".join(overlap_words), sentence]
+                    current_words = overlap_words + sentence_words
                 else:
                     # Single sentence is too long, split it
-                    words = sentence.split()
-                    for i in range(0, len(words), self.chunk_size):
-                        chunk_words = words[i:i + self.chunk_size]
+                    for i in range(0, len(sentence_words), self.chunk_size):
+                        chunk_words = sentence_words[i:i + self.chunk_size]
                         chunks.append(" ".join(chunk_words))
-                    current_chunk = ""
             else:
-                current_chunk = potential_chunk
+                current_parts.append(sentence)
+                current_words.extend(sentence_words)
         
         # Add the last chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        last_chunk = " ".join(current_parts).strip()
+        if last_chunk:
+            chunks.append(last_chunk)
             
         return chunks
     
+    def _extract_metadata(self, text: str, filename: str) -> DocumentMetadata:
+        """Extract metadata for a single chunk (GPT-4o-mini when configured, rules otherwise)"""
+        return self._extract_metadata_many([(text, filename)])[0]
+    
+    def _extract_metadata_many(self, documents: List[Tuple[str, str]]) -> List[DocumentMetadata]:
+        """Extract metadata for (chunk text, filename) pairs, in order"""
+        if self.metadata_service:
+            # One event loop for all chunks, with their calls in flight concurrently
+            logger.info(f"🤖 Calling GPT-4o-mini for metadata extraction of {len(documents)} chunks...")
+            return asyncio.run(self._enhance_metadata_many(documents))
+        
+        # Fallback to basic metadata extraction
+        logger.info(f"📝 Using fallback metadata extraction...")
+        return [self._extract_metadata_fallback(chunk_text, filename) for chunk_text, filename in documents]
+    
+    async def _enhance_metadata_many(self, documents: List[Tuple[str, str]]) -> List[DocumentMetadata]:
+        """GPT-4o-mini metadata for all documents, on a client bound to this asyncio.run loop"""
+        async with loop_bound_client(self.metadata_service.client) as client:
+            return await self.metadata_service.with_client(client).batch_enhance_metadata(
+                documents, concurrency=METADATA_CONCURRENCY
+            )
+    
     def _extract_metadata_fallback(self, text: str, filename: str) -> DocumentMetadata:
         """Extract metadata from chunk text"""
         text_lower = text.lower()
         
         # Category detection - PRIORITY-BASED for MVP (preparing for Query Expansion)
         category = None
-        
-        # Priority triggers - if mentioned, automatically assign category
-        if any(word in text_lower for word in ['aranžman', 'tura', 'program putovanja', 'itinerar']):
-            category = "tour"
-        elif any(word in text_lower for word in ['menu', 'karta', 'specijaliteti', 'kuhinja']):
-            category = "restaurant"
-        elif any(word in text_lower for word in ['ulaznica', 'radno vreme', 'poseta', 'obilazak']):
-            category = "attraction"
-        else:
-            # Fallback to simple detection for hotel (most common)
-            if any(word in text_lower for word in ['hotel', 'smeštaj', 'apartman', 'vila']):
-                category = "hotel"
+        for category_name, words in _CATEGORY_KEYWORDS:
+            if any(word in text_lower for word in words):
+                category = category_name
+                break
         
         # Location detection
         location = self._extract_location(text_lower, filename)
         
         # Price range detection
-        price_range = self._extract_price_range(text)
+        price_range = self._extract_price_range(text_lower)
         
         # Family friendly detection
-        family_friendly = any(word in text_lower for word in [
-            'porodica', 'deca', 'family', 'family-friendly', 'pogodno za decu'
-        ])
+        family_friendly = any(word in text_lower for word in _FAMILY_KEYWORDS)
         
         # Seasonal detection
         seasonal = self._extract_seasonal(text_lower)
@@ -179,162 +604,43 @@ class PDFProcessor:
     def _extract_location(self, text: str, filename: str = "") -> str:
         """Extract location from text with filename-based priority"""
         
-        # PRIORITY 1: Filename-based location detection (HIGHEST PRIORITY)
-        filename_lower = filename.lower()
-        
-        # Specific filename patterns for exact matching
-        filename_patterns = {
-            # French destinations
-            'romanticna_francuska': 'Pariz',
-            'francuska': 'Pariz',
-            'pariz': 'Pariz',
-            'france': 'Pariz',
-            
-            # Portuguese destinations  
-            'portugalska': 'Lisabon',
-            'portugal': 'Lisabon',
-            'lisabon': 'Lisabon',
-            'porto': 'Porto',
-            
-            # Italian destinations
-            'rim_': 'Rim',
-            'roma': 'Rim',
-            'italy': 'Rim',
-            'italija': 'Rim',
-            'toskana': 'Firenca',
-            'sicilija': 'Palermo',
-            'bari': 'Bari',
-            'pulja': 'Bari',
-            
-            # Turkish destinations
-            'istanbul': 'Istanbul',
-            'turska': 'Istanbul',
-            'turkey': 'Istanbul',
-            'kabadokija': 'Istanbul',
-            
-            # Dutch destinations
-            'amsterdam': 'Amsterdam',
-            'holland': 'Amsterdam',
-            'netherlands': 'Amsterdam',
-            
-            # Spanish destinations
-            'madrid': 'Madrid',
-            'barcelona': 'Barcelona',
-            'andaluzija': 'Sevilla',
-            'spain': 'Madrid',
-            
-            # Greek destinations
-            'grcka': 'Atina',
-            'greece': 'Atina',
-            'atina': 'Atina',
-            
-            # German destinations
-            'nemacka': 'Berlin',
-            'germany': 'Berlin',
-            'minhen': 'Minhen',
-            'munich': 'Minhen',
-            
-            # Serbian destinations
-            'beograd': 'Beograd',
-            'novi_sad': 'Novi Sad',
-            'kopaonik': 'Kopaonik',
-            'zlatibor': 'Zlatibor',
-            'tara': 'Tara',
-            
-            # Other destinations
-            'maroko': 'Kazablanka',
-            'morocco': 'Kazablanka',
-            'egipat': 'Kairo',
-            'egypt': 'Kairo',
-            'indija': 'Deli',
-            'india': 'Deli',
-            'kina': 'Peking',
-            'china': 'Peking',
-            'rusija': 'Moskva',
-            'russia': 'Moskva',
-            'sankt_petersburg': 'Sankt Peterburg',
-            'moskva': 'Moskva'
-        }
-        
-        # Check filename patterns first (HIGHEST PRIORITY)
-        for pattern, location in filename_patterns.items():
-            if pattern in filename_lower:
-                return location
-        
-        # Major cities and regions for text-based detection
-        locations = {
-            'beograd': 'Beograd',
-            'novi sad': 'Novi Sad',
-            'niš': 'Niš',
-            'kragujevac': 'Kragujevac',
-            'rim': 'Rim',
-            'rim ': 'Rim',
-            'roma': 'Rim',
-            'pariz': 'Pariz',
-            'berlin': 'Berlin',
-            'beč': 'Beč',
-            'vienna': 'Beč',
-            'prag': 'Prag',
-            'budimpešta': 'Budimpešta',
-            'istanbul': 'Istanbul',
-            'atina': 'Atina',
-            'solun': 'Solun',
-            'barcelona': 'Barcelona',
-            'madrid': 'Madrid',
-            'london': 'London',
-            'amsterdam': 'Amsterdam',
-            'kopaonik': 'Kopaonik',
-            'zlatibor': 'Zlatibor',
-            'tara': 'Tara',
-            'fruška gora': 'Fruška Gora'
-        }
+        # PRIORITY 1: Filename-based location detection (HIGHEST PRIORITY),
+        # specific filename patterns first, then generic location names
+        filename_location = _location_from_filename(filename)
+        if filename_location:
+            return filename_location
         
-        # Priority 2: Check generic location names in filename  
-        for key, value in locations.items():
-            if key in filename_lower and key != 'beograd':  # Skip Beograd (usually departure city)
-                return value
-        
-        # Priority 2: Count frequency of locations in text (excluding common departure cities)
+        # Priority 2: Count frequency of locations in text (excluding common departure cities).
+        # One count() per key is both the presence test and the tally; the first
+        # departure city seen is remembered for the fallback.
         location_counts = {}
-        for key, value in locations.items():
-            if key in text:
-                # Skip common departure cities that appear in travel documents
-                if key in ['beograd', 'novi sad', 'niš']:
-                    continue
-                location_counts[value] = text.count(key)
+        first_departure_city = None
+        for key, value in _TEXT_LOCATIONS.items():
+            count = text.count(key)
+            if not count:
+                continue
+            if key in _DEPARTURE_CITIES:
+                first_departure_city = first_departure_city or value
+                continue
+            location_counts[value] = count
         
         # Return most frequent location
         if location_counts:
             return max(location_counts, key=location_counts.get)
         
-        # Fallback: Check all locations including departure cities
-        for key, value in locations.items():
-            if key in text:
-                return value
-        
-        return None
+        # Fallback: no other location, so the departure city is all there is
+        return first_departure_city
     
-    def _extract_price_range(self, text: str) -> str:
-        """Extract price range from text based on prices mentioned"""
+    def _extract_price_range(self, text_lower: str) -> str:
+        """Extract price range from lowercased text based on prices mentioned"""
         # Extract all prices (€, $, RSD)
-        price_pattern = r'(\d+(?:\.\d+)?)\s*(?:€|eur|usd|\$|rsd|din)'
-        prices = re.findall(price_pattern, text.lower())
+        prices = _PRICE_RE.findall(text_lower)
         
         if not prices:
             return None
         
-        # Convert to float and find average
-        numeric_prices = []
-        for price in prices:
-            try:
-                numeric_prices.append(float(price))
-            except ValueError:
-                continue
-        
-        if not numeric_prices:
-            return None
-        
-        avg_price = sum(numeric_prices) / len(numeric_prices)
+        # The pattern only captures valid numbers, so float() cannot fail
+        avg_price = sum(map(float, prices)) / len(prices)
         
         # Categorize based on average price (assumes EUR)
         if avg_price < 50:
@@ -348,31 +654,27 @@ class PDFProcessor:
     
     def _extract_seasonal(self, text: str) -> str:
         """Extract seasonal information"""
-        if any(word in text for word in ['leto', 'summer', 'jun', 'jul', 'avgust']):
-            return "summer"
-        elif any(word in text for word in ['zima', 'winter', 'decembar', 'januar', 'februar']):
-            return "winter"
-        elif any(word in text for word in ['proleće', 'spring', 'mart', 'april', 'maj']):
-            return "spring"
-        elif any(word in text for word in ['jesen', 'autumn', 'septembar', 'oktobar', 'novembar']):
-            return "autumn"
-        else:
-            return "year_round"
+        for word, season in _SEASON_WORDS:
+            if word in text:
+                return season
+        return "year_round"
     
-    def _format_table(self, table: List[List[str]]) -> str:
-        """Format extracted table data"""
-        if not table:
-            return ""
-        
-        formatted_rows = []
-        for row in table:
-            if row:  # Skip empty rows
-                formatted_row = " | ".join(str(cell) if cell else "" for cell in row)
-                formatted_rows.append(formatted_row)
+    def _generate_chunk_ids(self, filename: str, chunk_count: int) -> List[str]:
+        """Generate unique chunk IDs, the MD5 of "{filename}_{chunk_index}" per chunk
         
-        return "\n".join(formatted_rows)
-    
-    def _generate_chunk_id(self, filename: str, chunk_index: int) -> str:
-        """Generate unique chunk ID"""
-        content = f"{filename}_{chunk_index}"
-        return hashlib.md5(content.encode()).hexdigest()[:12] 
\ No newline at end of file
+        Chunks extracted with another backend than pdfplumber differ in text, so
+        the backend is part of their ids ("{filename}_{backend}_{chunk_index}");
+        otherwise VectorService would skip them as already stored and keep the
+        old text.
+        """
+        # Not a security hash. It stays MD5 because VectorService skips chunks whose
+        # ids are already stored; a different hash would re-add every re-ingested file.
+        # The filename prefix is hashed once and the state copied for each index.
+        prefix = f"{filename}_" if PDF_TEXT_BACKEND == "pdfplumber" else f"{filename}_{PDF_TEXT_BACKEND}_"
+        prefix_hash = hashlib.md5(prefix.encode(), usedforsecurity=False)
+        chunk_ids = []
+        for chunk_index in range(chunk_count):
+            chunk_hash = prefix_hash.copy()
+            chunk_hash.update(str(chunk_index).encode())
+            chunk_ids.append(chunk_hash.hexdigest()[:12])
+        return chunk_ids 
\ No newline at end of file
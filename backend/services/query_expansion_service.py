@@ -1,17 +1,140 @@
 import asyncio
-import json
 import logging
-from typing import Dict, List, Optional
-from openai import AsyncOpenAI
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from functools import lru_cache
-import hashlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+from openai import AsyncOpenAI
+import numpy as np
+import orjson
+
+from services.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
+# Expansion is a short synonym list, so it runs on a smaller, faster model than
+# response generation (which stays on gpt-4o-mini)
+QUERY_EXPANSION_MODEL = os.getenv("QUERY_EXPANSION_MODEL", "gpt-4.1-nano")
+
+# Exact cache: bounded in-memory LRU in front of a persistent SQLite store;
+# entries in both expire a day after the expansion was generated
+QUERY_CACHE_MAX_ENTRIES = 10_000
+QUERY_CACHE_TTL_SECONDS = 24 * 3600
+QUERY_CACHE_DB_PATH = Path(__file__).parent.parent / "cache" / "query_expansion_cache.sqlite3"
+
+# Semantic cache tier: paraphrased queries ("hotel u Rimu" / "smeštaj u Rimu")
+# reuse an earlier expansion when their embeddings are similar enough
+SEMANTIC_CACHE_SIZE = 512
+SEMANTIC_SIMILARITY_THRESHOLD = 0.93
+
+# Static expansion instructions go in the system message; the user message
+# carries only the query, so every request shares the same prompt prefix
+_EXPANSION_SYSTEM_PROMPT = """Ti si ekspert za srpski jezik i turizam. Proširi turistički upit sinonimima i srodnim terminima.
+Uključi:
+- sinonime (hotel → smeštaj, apartman, vila, pansion, boutique)
+- regionalne nazive (Rim → Roma, Rome, Italija, Italy)
+- semantičke varijante relevantne za upit (romantičan → za parove, medeni mesec, spa; porodičan → family, deca, animacija; luksuzno → premium, wellness, vrhunski)
+- morfološke oblike (najbolji → top, odličan, vrhunski) i turističke termine (letovanje → odmor, more, plaža)
+Pravila: srodni termini grupisani, najviše 12 termina; ne mešaj romantične i porodične termine.
+Vrati termine redom u listi "terms" (biće spojeni sa OR).
+Primer: "hotel u Rimu" → {"terms": ["hotel", "smeštaj", "apartman", "vila", "pansion u Rimu", "Roma", "Rome", "Italija", "Italy", "centar"]}"""
+
+# Structured output: the model returns the expansion terms as a JSON list, so
+# replies can't contain explanations around the expansion
+_EXPANSION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "query_expansion",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"terms": {"type": "array", "items": {"type": "string"}}},
+            "required": ["terms"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Tourism-related keywords, built once at import
+_TOURISM_KEYWORDS = (
+    # Accommodation
+    "hotel", "smeštaj", "apartman", "vila", "pansion", "boutique", "resort",
+    "hostel", "garni", "motel", "pension", "guesthouse",
+    
+    # Food & Dining  
+    "restoran", "kafana", "gostionica", "lokantić", "restaurant", "bar",
+    "pizzeria", "fast food", "fine dining", "buffet",
+    
+    # Activities
+    "tura", "izlet", "putovanje", "aranžman", "tour", "excursion",
+    "sightseeing", "obilazak", "poseta", "visit",
+    
+    # Locations
+    "centar", "city center", "centro", "središte", "downtown",
+    "plaža", "more", "beach", "obala", "coast",
+    
+    # Amenities
+    "bazen", "pool", "spa", "wellness", "fitness", "parking",
+    "wifi", "klima", "balkon", "terasa", "pogled",
+    
+    # Price ranges
+    "jeftino", "budget", "economical", "luksuzno", "luxury", "premium",
+    "povoljno", "affordable", "skupo", "expensive"
+)
+
+# Basic Serbian tourism synonyms for the fallback expansion
+_FALLBACK_SYNONYMS = {
+    "hotel": ["smeštaj", "apartman", "vila", "pansion", "boutique"],
+    "restoran": ["kafana", "gostionica", "lokantić", "restaurant"],
+    "plaža": ["more", "beach", "kupanje", "sunčanje"],
+    "tura": ["izlet", "putovanje", "aranžman", "tour"],
+    "centar": ["city center", "centro", "središte"],
+    "letovanje": ["odmor", "vacation", "holiday", "more"],
+    "romantičan": ["za parove", "intimno", "romantic"],
+    "luksuzno": ["lux", "luxury", "premium", "vrhunsko"],
+    "porodična": ["family", "sa decom", "kids friendly"],
+    
+    # Geographic variants
+    "rim": ["roma", "rome", "italija", "italy"],
+    "beograd": ["belgrade", "srbija", "serbia"],
+    "istanbul": ["turkey", "turska", "constantinople"],
+    "amsterdam": ["netherlands", "holandija", "holland"],
+    "pariz": ["paris", "francuska", "france"]
+}
+
+# Up to 3 synonyms per key, in key order
+_FALLBACK_SYNONYM_ITEMS = tuple((key, tuple(syn_list[:3])) for key, syn_list in _FALLBACK_SYNONYMS.items())
+
+@lru_cache(maxsize=4096)
+def _word_synonyms(word: str) -> Tuple[str, ...]:
+    """Synonyms of every key contained in a lowercased query word"""
+    return tuple(synonym for key, synonyms in _FALLBACK_SYNONYM_ITEMS if key in word for synonym in synonyms)
+
 class QueryExpansionService:
-    def __init__(self, openai_client: AsyncOpenAI):
+    def __init__(self, openai_client: AsyncOpenAI, max_llm_concurrency: int = 10,
+                 embedding_cache: Optional[EmbeddingCache] = None,
+                 cache_path: Optional[Path] = QUERY_CACHE_DB_PATH):
         self.client = openai_client
-        self.cache: Dict[str, str] = {}
+        # Query embeddings, shared with other services when one cache is passed in
+        self._embedding_cache = embedding_cache or EmbeddingCache(openai_client)
+        
+        # Shared cap on in-flight OpenAI calls (expansions and embeddings)
+        self._llm_sem = asyncio.Semaphore(max_llm_concurrency)
+        
+        # Query cache key -> (expiry time, expansion), least recently used first
+        self.cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # SQLite keeps expansions across restarts
+        self._disk = self._open_disk_cache(cache_path) if cache_path else None
+        
+        # Ring buffer of unit-normalized query embeddings (one row per entry,
+        # allocated on the first store) and the expansions they map to
+        self._cache_vecs: Optional[np.ndarray] = None
+        self._cache_vals: List[str] = []
+        self._cache_next = 0
         
     async def expand_query_llm(self, query: str) -> str:
         """
@@ -20,15 +143,28 @@ class QueryExpansionService:
         try:
             # Check cache first
             cache_key = self._get_cache_key(query)
-            if cache_key in self.cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
                 logger.info(f"Cache hit for query: {query}")
-                return self.cache[cache_key]
+                return cached
+            
+            # Then a paraphrase of an earlier query
+            embedding = await self._embed_query(query)
+            expanded = self._semantic_cache_lookup(embedding)
+            if expanded is not None:
+                logger.info(f"Semantic cache hit for query: {query}")
+                self._cache_put(cache_key, expanded)
+                return expanded
             
             # Generate expansion using LLM
             expanded = await self._generate_expansion(query)
+            if expanded is None:
+                # A failed call may succeed next time, so the fallback isn't cached
+                return await self._fallback_expansion(query)
             
             # Cache the result
-            self.cache[cache_key] = expanded
+            self._cache_put(cache_key, expanded)
+            self._semantic_cache_store(embedding, expanded)
             
             logger.info(f"Expanded query: '{query}' -> '{expanded}'")
             return expanded
@@ -38,55 +174,28 @@ class QueryExpansionService:
             # Fallback to basic expansion
             return await self._fallback_expansion(query)
     
-    async def _generate_expansion(self, query: str) -> str:
+    async def _generate_expansion(self, query: str) -> Optional[str]:
         """
         Generate semantic expansion using LLM
+        
+        Returns None when the call fails or the expansion is invalid
         """
-        prompt = f"""
-Ti si ekspert za srpski jezik i turizam. Tvoj zadatak je da proširiš turistički upit sa sinonimima i srodnim terminima.
-
-Originalni upit: "{query}"
-
-Generiši proširenu pretragu koja uključuje:
-1. Sinonime na srpskom (hotel → smeštaj, apartman, vila, pansion, boutique)
-2. Regionalne termine (Rim → Roma, Rome, Italija, Italy)
-3. Semantičke varijante RELEVANTNE za originalni upit:
-   - romantičan → za parove, medeni mesec, spa, luksuzno, intimno
-   - porodičan → family, deca, animacija, playground, kids
-   - luksuzno → premium, spa, wellness, vrhunski
-4. Morfološke oblike (najbolji → top, odličan, prvoklasan, vrhunski)
-5. Tourism specifične termine (letovanje → odmor, more, plaža, beach, vacation)
-
-Pravila:
-- Koristi OR operator između termina
-- Zadrži logičku strukturu originalnog upita (grupisi related termine)
-- Maksimalno 12-15 termina (fokus na relevantnost)
-- VAŽNO: Semantičke varijante moraju biti RELEVANTNE za originalni upit
-- NE dodavaj "romantičan" termine ako je upit "porodičan"
-- NE dodavaj "porodičan" termine ako je upit "romantičan"
-- Fokus na specifične tourism termine povezane sa originalnim zahtevom
-
-Format odgovora: samo prošireni query bez objašnjenja.
-
-Primer:
-Input: "hotel u Rimu"
-Output: "hotel OR smeštaj OR apartman OR vila OR pansion u Rimu OR Roma OR Rome OR Italija OR Italy OR centar"
-
-Tvoj odgovor:
-"""
 
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Ti si ekspert za srpski jezik i turizam. Odgovaraj kratko i precizno."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.3
-            )
+            async with self._llm_sem:
+                response = await self.client.chat.completions.create(
+                    model=QUERY_EXPANSION_MODEL,
+                    messages=[
+                        {"role": "system", "content": _EXPANSION_SYSTEM_PROMPT},
+                        {"role": "user", "content": f'Upit: "{query}"'}
+                    ],
+                    response_format=_EXPANSION_RESPONSE_FORMAT,
+                    max_tokens=200,
+                    temperature=0.3
+                )
             
-            expanded_query = response.choices[0].message.content.strip()
+            terms = [term.strip() for term in orjson.loads(response.choices[0].message.content)["terms"]]
+            expanded_query = " OR ".join(term for term in terms if term)
             
             # Validate expansion
             if self._is_valid_expansion(expanded_query, query):
@@ -98,45 +207,23 @@ Tvoj odgovor:
                 return expanded_query
             else:
                 logger.warning(f"Invalid LLM expansion for '{query}': {expanded_query}")
-                return await self._fallback_expansion(query)
+                return None
                 
         except Exception as e:
             logger.error(f"LLM expansion failed for '{query}': {e}")
-            return await self._fallback_expansion(query)
+            return None
     
     async def _fallback_expansion(self, query: str) -> str:
         """
         Fallback to basic synonym expansion if LLM fails
         """
-        # Basic Serbian tourism synonyms
-        synonyms = {
-            "hotel": ["smeštaj", "apartman", "vila", "pansion", "boutique"],
-            "restoran": ["kafana", "gostionica", "lokantić", "restaurant"],
-            "plaža": ["more", "beach", "kupanje", "sunčanje"],
-            "tura": ["izlet", "putovanje", "aranžman", "tour"],
-            "centar": ["city center", "centro", "središte"],
-            "letovanje": ["odmor", "vacation", "holiday", "more"],
-            "romantičan": ["za parove", "intimno", "romantic"],
-            "luksuzno": ["lux", "luxury", "premium", "vrhunsko"],
-            "porodična": ["family", "sa decom", "kids friendly"],
-            
-            # Geographic variants
-            "rim": ["roma", "rome", "italija", "italy"],
-            "beograd": ["belgrade", "srbija", "serbia"],
-            "istanbul": ["turkey", "turska", "constantinople"],
-            "amsterdam": ["netherlands", "holandija", "holland"],
-            "pariz": ["paris", "francuska", "france"]
-        }
-        
         expanded_terms = []
         original_words = query.lower().split()
         
         for word in original_words:
             expanded_terms.append(word)
             # Add synonyms if found
-            for key, syn_list in synonyms.items():
-                if key in word:
-                    expanded_terms.extend(syn_list[:3])  # Limit to 3 synonyms
+            expanded_terms.extend(_word_synonyms(word))
         
         # Remove duplicates and join
         unique_terms = list(dict.fromkeys(expanded_terms))
@@ -146,74 +233,169 @@ Tvoj odgovor:
         """
         Validate that expansion is reasonable
         """
-        if not expanded or len(expanded) < len(original):
+        expanded_length = len(expanded)
+        if not expanded or expanded_length < len(original):
             return False
         
         # Check for OR operators
         if " OR " not in expanded:
             return False
         
-        # Count number of OR terms
-        terms = expanded.split(" OR ")
-        terms_count = len(terms)
+        # Count number of OR terms (a count, not a split into a term list)
+        terms_count = expanded.count(" OR ") + 1
         
         # If too many terms, truncate to first 12 (don't reject completely)
         if terms_count > 12:
             logger.warning(f"Too many expansion terms ({terms_count}) for '{original}', truncating to 12")
             # Truncate to first 12 terms and return modified expansion
-            truncated_terms = terms[:12]
+            truncated_terms = expanded.split(" OR ", 12)[:12]
             truncated_expansion = " OR ".join(truncated_terms)
             # Store truncated version for return
             self._truncated_expansion = truncated_expansion
             return True
             
         # Check expansion ratio (not too long)
-        expansion_ratio = len(expanded) / len(original)
+        expansion_ratio = expanded_length / len(original)
         if expansion_ratio > 15:  # Slightly increased limit
             logger.warning(f"Expansion too long (ratio: {expansion_ratio:.1f}) for '{original}'")
             return False
             
         return True
     
+    def _open_disk_cache(self, cache_path: Path) -> Optional[sqlite3.Connection]:
+        """
+        Open (or create) the persistent expansion cache
+        """
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(cache_path), check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS expansion_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            connection.commit()
+            return connection
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Persistent query expansion cache disabled: {e}")
+            return None
+    
+    def _cache_get(self, cache_key: str) -> Optional[str]:
+        """
+        Look up an unexpired expansion in the LRU, then on disk (promoting disk hits)
+        """
+        entry = self.cache.get(cache_key)
+        if entry is not None:
+            expires_at, expanded = entry
+            if expires_at >= time.time():
+                self.cache.move_to_end(cache_key)
+                return expanded
+            del self.cache[cache_key]
+        
+        if self._disk is None:
+            return None
+        
+        try:
+            row = self._disk.execute(
+                "SELECT value, stored_at FROM expansion_cache WHERE key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            expanded, stored_at = row
+            if time.time() - stored_at > QUERY_CACHE_TTL_SECONDS:
+                self._disk.execute("DELETE FROM expansion_cache WHERE key = ?", (cache_key,))
+                self._disk.commit()
+                return None
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read query expansion cache entry: {e}")
+            return None
+        
+        self._remember(cache_key, expanded, stored_at + QUERY_CACHE_TTL_SECONDS)
+        return expanded
+    
+    def _cache_put(self, cache_key: str, expanded: str):
+        """
+        Store an expansion in the LRU and on disk
+        """
+        stored_at = time.time()
+        self._remember(cache_key, expanded, stored_at + QUERY_CACHE_TTL_SECONDS)
+        
+        if self._disk is None:
+            return
+        
+        try:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO expansion_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (cache_key, expanded, stored_at)
+            )
+            self._disk.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write query expansion cache entry: {e}")
+    
+    def _remember(self, cache_key: str, expanded: str, expires_at: float):
+        """
+        Insert into the in-memory LRU, evicting the least recently used entry when full
+        """
+        self.cache[cache_key] = (expires_at, expanded)
+        self.cache.move_to_end(cache_key)
+        if len(self.cache) > QUERY_CACHE_MAX_ENTRIES:
+            self.cache.popitem(last=False)
+    
+    async def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        """
+        Unit-normalized query embedding for the semantic cache tier
+        """
+        async with self._llm_sem:
+            return await self._embedding_cache.get(query)
+    
+    def _semantic_cache_lookup(self, embedding: Optional[np.ndarray]) -> Optional[str]:
+        """
+        Return the expansion of the most similar cached query above the threshold
+        """
+        if embedding is None or not self._cache_vals:
+            return None
+        
+        # Cosine similarities against all cached queries in one matrix-vector product
+        similarities = self._cache_vecs[:len(self._cache_vals)] @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < SEMANTIC_SIMILARITY_THRESHOLD:
+            return None
+        return self._cache_vals[best]
+    
+    def _semantic_cache_store(self, embedding: Optional[np.ndarray], expanded: str):
+        """
+        Add an expansion to the semantic tier, overwriting the oldest entry when full
+        """
+        if embedding is None:
+            return
+        if self._cache_vecs is None or self._cache_vecs.shape[1] != embedding.shape[0]:
+            self._cache_vecs = np.zeros((SEMANTIC_CACHE_SIZE, embedding.shape[0]), dtype=np.float32)
+            self._cache_vals = []
+            self._cache_next = 0
+        
+        self._cache_vecs[self._cache_next] = embedding
+        if self._cache_next < len(self._cache_vals):
+            self._cache_vals[self._cache_next] = expanded
+        else:
+            self._cache_vals.append(expanded)
+        self._cache_next = (self._cache_next + 1) % SEMANTIC_CACHE_SIZE
+    
     def _get_cache_key(self, query: str) -> str:
         """
         Generate cache key for query
         """
-        return hashlib.md5(query.lower().encode()).hexdigest()
+        # The lowercased query itself is the key, in memory and in the SQLite table
+        return query.lower()
     
-    @lru_cache(maxsize=100)
     def get_tourism_keywords(self) -> List[str]:
         """
         Get comprehensive list of tourism-related keywords
         """
-        return [
-            # Accommodation
-            "hotel", "smeštaj", "apartman", "vila", "pansion", "boutique", "resort",
-            "hostel", "garni", "motel", "pension", "guesthouse",
-            
-            # Food & Dining  
-            "restoran", "kafana", "gostionica", "lokantić", "restaurant", "bar",
-            "pizzeria", "fast food", "fine dining", "buffet",
-            
-            # Activities
-            "tura", "izlet", "putovanje", "aranžman", "tour", "excursion",
-            "sightseeing", "obilazak", "poseta", "visit",
-            
-            # Locations
-            "centar", "city center", "centro", "središte", "downtown",
-            "plaža", "more", "beach", "obala", "coast",
-            
-            # Amenities
-            "bazen", "pool", "spa", "wellness", "fitness", "parking",
-            "wifi", "klima", "balkon", "terasa", "pogled",
-            
-            # Price ranges
-            "jeftino", "budget", "economical", "luksuzno", "luxury", "premium",
-            "povoljno", "affordable", "skupo", "expensive"
-        ]
+        return list(_TOURISM_KEYWORDS)
 
 # Singleton instance
 _query_expansion_service = None
+_query_expansion_service_lock = threading.Lock()
 
 def get_query_expansion_service(openai_client: AsyncOpenAI) -> QueryExpansionService:
     """
@@ -221,5 +403,7 @@ def get_query_expansion_service(openai_client: AsyncOpenAI) -> QueryExpansionSer
     """
     global _query_expansion_service
     if _query_expansion_service is None:
-        _query_expansion_service = QueryExpansionService(openai_client)
+        with _query_expansion_service_lock:
+            if _query_expansion_service is None:
+                _query_expansion_service = QueryExpansionService(openai_client)
     return _query_expansion_service 
\ No newline at end of file
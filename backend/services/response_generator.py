@@ -1,16 +1,176 @@
-import asyncio
-import json
+import copy
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, Tuple
 from dataclasses import dataclass
 from openai import AsyncOpenAI
+import orjson
 
 from .self_querying_service import StructuredQuery
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Static answer instructions for _generate_natural_response, sent as the system
+# message; the user message carries only the query, filters and results
+_RESPONSE_SYSTEM_PROMPT = """Ti si TurBot, profesionalni turistički agent. Odgovaraj ljubazno i korisno na srpskom jeziku.
+- Ako ima rezultata, UVEK ih prikaži, i kada se ne poklapaju svi kriterijumi; navedi šta se poklapa a šta ne (lokacija ✓, datum ✗, cena ✓).
+- Daj 2-3 konkretne opcije sa detaljima (naziv, cena, datum), pa tek onda alternative (slične opcije ili datume, uz razlog).
+Struktura: pozdrav sa kratkom procenom ("Zdravo! ..."), dostupne opcije, alternative ako nisu ispunjeni svi kriterijumi, poziv na akciju ("Da li vas neka od ovih opcija zanima?"). Ne piši nazive delova.
+Stil: profesionalan ali prijatan, direktan i informativan, bez previše casual izraza."""
+
+# Structured output for _generate_natural_response: the model reports whether
+# the answer already cites its sources instead of the text being scanned for it
+_NATURAL_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "turbot_reply",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "response": {"type": "string"},
+                "mentions_sources": {
+                    "type": "boolean",
+                    "description": "true ako odgovor već navodi dokumente ili aranžmane iz kojih potiču informacije"
+                }
+            },
+            "required": ["response", "mentions_sources"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Finished responses keyed by query, filters, conversation and retrieved results
+RESPONSE_CACHE_MAX_ENTRIES = 512
+
+# Static instructions for the standard generate_response answer, sent as the
+# system message; the conversation, retrieved content and question follow in
+# the user message, so every request shares this prefix
+_STANDARD_SYSTEM_PROMPT = """Ti si TurBot, AI asistent za turističke agencije. Odgovori na srpskom jeziku koristeći dostupne informacije.
+
+INSTRUKCIJE:
+- Odgovori prirodno i prijateljski na srpskom jeziku
+- Koristi informacije iz dostupnih dokumenata
+- Ako nemaš tačne informacije, budi iskren
+- Fokusiraj se na korisne detalje (cene, datumi, lokacije)
+- Budi kratak i precizan (maksimalno 3-4 pasusa)
+- Izbegavaj dugačke strukture i sekcije"""
+
+# Prompt cache routing key for requests that share _STANDARD_SYSTEM_PROMPT;
+# bump the version whenever that prompt changes
+_STANDARD_PROMPT_CACHE_KEY = "turbot_standard_v1"
+
+# Routes natural-response requests that share _RESPONSE_SYSTEM_PROMPT to the
+# same prompt cache; bump the version whenever the system prompt changes
+_RESPONSE_PROMPT_CACHE_KEY = "turbot_response_v1"
+
+# Response templates for different intents
+_RESPONSE_TEMPLATES: Mapping[str, str] = MappingProxyType({
+    "search": "Na osnovu vaše pretrage pronašao sam sledeće opcije:",
+    "recommendation": "Evo mojih preporuka za vas:",
+    "comparison": "Evo poređenja opcija koje ste tražili:",
+    "information": "Evo informacija koje ste tražili:",
+    "booking": "Evo dostupnih opcija za rezervaciju:"
+})
+
+# Suggested questions templates per result category
+_SUGGESTED_QUESTIONS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "hotel": (
+        "Kakve su dodatne usluge u hotelu?",
+        "Da li hotel ima spa ili wellness centar?",
+        "Kakve su mogućnosti ishrane?",
+        "Da li je hotel pogodan za porodice sa decom?"
+    ),
+    "tour": (
+        "Šta je uključeno u cenu aranžmana?",
+        "Kakav je prevoz predviđen?",
+        "Da li postoje dodatni izleti?",
+        "Koliko dana traje putovanje?"
+    ),
+    "restaurant": (
+        "Kakva je kuhinja u restoranu?",
+        "Da li je potrebna rezervacija?",
+        "Kakve su cene jela?",
+        "Da li imaju vegetarijanske opcije?"
+    )
+})
+
+# Generic suggestions used when result categories give fewer than three
+_GENERIC_SUGGESTED_QUESTIONS = (
+    "Možete li mi dati više detalja o cenama?",
+    "Da li postoje alternativne opcije?",
+    "Kako mogu da rezervišem?",
+    "Da li imate preporuke za dodatne aktivnosti?"
+)
+
+# Adjacent months and season per travel month, for "try another month" alternatives
+_MONTH_ALTERNATIVES: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    'january': {'adjacent': ('december', 'february'), 'season': 'zimski'},
+    'february': {'adjacent': ('january', 'march'), 'season': 'zimski'},
+    'march': {'adjacent': ('february', 'april'), 'season': 'prolećni'},
+    'april': {'adjacent': ('march', 'may'), 'season': 'prolećni'},
+    'may': {'adjacent': ('april', 'june'), 'season': 'prolećni'},
+    'june': {'adjacent': ('may', 'july'), 'season': 'letnji'},
+    'july': {'adjacent': ('june', 'august'), 'season': 'letnji'},
+    'august': {'adjacent': ('july', 'september'), 'season': 'letnji'},
+    'september': {'adjacent': ('august', 'october'), 'season': 'jesenji'},
+    'october': {'adjacent': ('september', 'november'), 'season': 'jesenji'},
+    'november': {'adjacent': ('october', 'december'), 'season': 'jesenji'},
+    'december': {'adjacent': ('november', 'january'), 'season': 'zimski'}
+})
+
+# Serbian month names
+_SERBIAN_MONTHS: Mapping[str, str] = MappingProxyType({
+    'january': 'januar', 'february': 'februar', 'march': 'mart',
+    'april': 'april', 'may': 'maj', 'june': 'jun',
+    'july': 'jul', 'august': 'avgust', 'september': 'septembar',
+    'october': 'oktobar', 'november': 'novembar', 'december': 'decembar'
+})
+
+# Similar destinations per location
+_LOCATION_GROUPS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    'Rim': ('Firenca', 'Venecija', 'Milano', 'Napulj'),
+    'Pariz': ('London', 'Amsterdam', 'Brisel', 'Madrid'),
+    'Amsterdam': ('Brisel', 'Pariz', 'Berlin', 'Prag'),
+    'Istanbul': ('Antalija', 'Kapadokija', 'Izmir', 'Bodrum'),
+    'Madrid': ('Barselona', 'Sevilla', 'Lisabon', 'Porto'),
+    'Atina': ('Solun', 'Santorini', 'Mikonos', 'Krit'),
+    'Budva': ('Kotor', 'Herceg Novi', 'Tivat', 'Bar'),
+    'Split': ('Dubrovnik', 'Zadar', 'Pula', 'Rijeka')
+})
+
+# Related categories per result category
+_CATEGORY_ALTERNATIVES: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    'hotel': ('apartman', 'villa', 'resort', 'pansion'),
+    'tour': ('izlet', 'tura', 'aranžman', 'paket'),
+    'restaurant': ('kafić', 'bar', 'restoran', 'lokalna gastronomija'),
+    'attraction': ('muzej', 'spomenik', 'park', 'kulturna baština')
+})
+
+# Neighbouring price ranges per price range
+_PRICE_ALTERNATIVES: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    'budget': ('moderate - možda nešto skuplje ali sa boljim sadržajem',),
+    'moderate': ('budget - ekonomičnije opcije', 'expensive - luksuznije opcije'),
+    'expensive': ('moderate - nešto povoljnije opcije',),
+    'luxury': ('expensive - i dalje kvalitetno ali pristupačnije',)
+})
+
+def _preview(text: str, limit: int) -> str:
+    """Text cut to limit characters, with "..." only when something was cut"""
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+def format_metadata_for_prompt(metadata: Dict[str, Any]) -> str:
+    """Compact "key=value | ..." rendering of chunk metadata for LLM prompts
+    
+    Unset fields are skipped; most chunks fill only a few of the metadata
+    fields, and the dict repr spent tokens on every None.
+    """
+    return " | ".join(f"{key}={value}" for key, value in metadata.items() if value or value == 0)
+
+@dataclass(slots=True)
 class ResponseData:
     """Response data with structured information"""
     response: str  # Natural language response
@@ -39,38 +199,8 @@ class ResponseGenerator:
     
     def __init__(self, client: AsyncOpenAI):
         self.client = client
-        self.cache = {}  # Simple in-memory cache
-        
-        # Response templates for different intents
-        self.response_templates = {
-            "search": "Na osnovu vaše pretrage pronašao sam sledeće opcije:",
-            "recommendation": "Evo mojih preporuka za vas:",
-            "comparison": "Evo poređenja opcija koje ste tražili:",
-            "information": "Evo informacija koje ste tražili:",
-            "booking": "Evo dostupnih opcija za rezervaciju:"
-        }
-        
-        # Suggested questions templates
-        self.suggested_questions_templates = {
-            "hotel": [
-                "Kakve su dodatne usluge u hotelu?",
-                "Da li hotel ima spa ili wellness centar?",
-                "Kakve su mogućnosti ishrane?",
-                "Da li je hotel pogodan za porodice sa decom?"
-            ],
-            "tour": [
-                "Šta je uključeno u cenu aranžmana?",
-                "Kakav je prevoz predviđen?",
-                "Da li postoje dodatni izleti?",
-                "Koliko dana traje putovanje?"
-            ],
-            "restaurant": [
-                "Kakva je kuhinja u restoranu?",
-                "Da li je potrebna rezervacija?",
-                "Kakve su cene jela?",
-                "Da li imaju vegetarijanske opcije?"
-            ]
-        }
+        # Bounded LRU of finished responses (copies are handed out, never the cached object)
+        self.cache: "OrderedDict[Tuple[Any, ...], ResponseData]" = OrderedDict()
 
     async def generate_response(
         self, 
@@ -79,6 +209,59 @@ class ResponseGenerator:
         conversation_context: Optional[Dict[str, Any]] = None
     ) -> ResponseData:
         """Generate response using RAG results with conversation context"""
+        # A key that can't be built (unexpected input types) only skips the cache
+        try:
+            cache_key = self._get_response_cache_key(search_results, structured_query, conversation_context)
+        except Exception as e:
+            logger.warning(f"⚠️ Response cache key failed, generating uncached: {e}")
+            cache_key = None
+        
+        if cache_key is not None:
+            cached_response = self.cache.get(cache_key)
+            if cached_response is not None:
+                self.cache.move_to_end(cache_key)
+                print("   ⚡ Response cache hit")
+                return copy.deepcopy(cached_response)
+        
+        response_data = await self._generate_response(search_results, structured_query, conversation_context)
+        
+        # Error fallbacks carry no sources and are not cached, so they are retried next time
+        if cache_key is not None and response_data.sources:
+            self.cache[cache_key] = copy.deepcopy(response_data)
+            if len(self.cache) > RESPONSE_CACHE_MAX_ENTRIES:
+                self.cache.popitem(last=False)
+        return response_data
+    
+    def _get_response_cache_key(
+        self, 
+        search_results: List[Dict[str, Any]], 
+        structured_query: StructuredQuery,
+        conversation_context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Any, ...]:
+        """
+        Query, intent, filters, result ids in rank order and the conversation text
+        
+        Only the role and content of recent messages go into the key: their
+        timestamps differ on every request and would prevent any hit. Results
+        without an id (callers other than /chat) are identified by their content.
+        """
+        context = conversation_context or {}
+        return (
+            structured_query.semantic_query,
+            structured_query.intent,
+            str(structured_query.filters),
+            tuple(result.get('id') or result.get('content') for result in search_results),
+            tuple((msg['role'], msg['content']) for msg in context.get('recent_conversation') or ()),
+            tuple((entity_type, str(value)) for entity_type, value in (context.get('active_entities') or {}).items())
+        )
+
+    async def _generate_response(
+        self, 
+        search_results: List[Dict[str, Any]], 
+        structured_query: StructuredQuery,
+        conversation_context: Optional[Dict[str, Any]] = None
+    ) -> ResponseData:
+        """Generate a fresh response, bypassing the response cache"""
         try:
             print(f"\n🤖 RESPONSE GENERATOR:")
             print(f"   Number of search results: {len(search_results)}")
@@ -134,7 +317,7 @@ class ResponseGenerator:
                 sources.append({
                     "document_name": source_file,
                     "relevance": f"{similarity:.0%}",
-                    "snippet": content[:150] + "..." if len(content) > 150 else content
+                    "snippet": _preview(content, 150)
                 })
             
             print(f"   Context prepared: {len(context_text)} characters from {len(sources)} sources")
@@ -160,24 +343,17 @@ class ResponseGenerator:
             else:
                 print(f"   No conversation context to include in prompt")
             
-            # Create natural system prompt (shorter and more conversational like streaming)
-            system_prompt = f"""Ti si TurBot, AI asistent za turističke agencije. Odgovori na srpskom jeziku koristeći dostupne informacije.
-
-{conversation_prompt if conversation_prompt else ""}DOSTUPNI SADRŽAJ:
+            # Static instructions stay in the system message; everything that varies
+            # per request goes into the user message after them
+            user_content = f"""{conversation_prompt}DOSTUPNI SADRŽAJ:
 {context_text}
 
-INSTRUKCIJE:
-- Odgovori prirodno i prijateljski na srpskom jeziku
-- Koristi informacije iz dostupnih dokumenata
-- Ako nemaš tačne informacije, budi iskren
-- Fokusiraj se na korisne detalje (cene, datumi, lokacije)
-- Budi kratak i precizan (maksimalno 3-4 pasusa)
-- Izbegavaj dugačke strukture i sekcije"""
+PITANJE: {structured_query.semantic_query}"""
 
-            print(f"   System prompt prepared: {len(system_prompt)} characters")
+            print(f"   User prompt prepared: {len(user_content)} characters")
             
             # Calculate estimated token usage
-            estimated_input_tokens = len(system_prompt) // 4  # Rough estimate: 4 chars = 1 token
+            estimated_input_tokens = (len(_STANDARD_SYSTEM_PROMPT) + len(user_content)) // 4  # Rough estimate: 4 chars = 1 token
             print(f"   💰 Estimated input tokens: ~{estimated_input_tokens}")
             print(f"   💰 Estimated cost: ~${estimated_input_tokens * 0.000150:.6f}")
             print(f"   Sending to OpenAI GPT-4o-mini...")
@@ -185,10 +361,11 @@ INSTRUKCIJE:
             response = await self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": structured_query.semantic_query}
+                    {"role": "system", "content": _STANDARD_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_content}
                 ],
                 max_tokens=400,  # Shorter responses like streaming endpoint
+                extra_body={"prompt_cache_key": _STANDARD_PROMPT_CACHE_KEY},
                 temperature=0.1  # More consistent responses like streaming endpoint
             )
             
@@ -329,13 +506,13 @@ INSTRUKCIJE:
                 
                 detailed_content_summary += f"\n--- DOKUMENT {i}: {source_file} (Relevantnost: {similarity:.1%}) ---\n"
                 detailed_content_summary += f"KOMPLETNI SADRŽAJ:\n{content}\n"
-                detailed_content_summary += f"METADATA: {metadata}\n"
+                detailed_content_summary += f"METADATA: {format_metadata_for_prompt(metadata)}\n"
                 detailed_content_summary += "-" * 80 + "\n"
                 
                 sources.append({
                     "document_name": source_file,
                     "similarity": similarity,
-                    "content_preview": content[:300] + "..." if len(content) > 300 else content,
+                    "content_preview": _preview(content, 300),
                     "metadata": metadata,
                     "detailed_content_available": True
                 })
@@ -534,6 +711,44 @@ ODGOVOR:"""
         """
         Generate natural Serbian response using LLM
         """
+        prompt = self._build_natural_response_prompt(search_results, structured_query, conversation_context)
+        
+        try:
+            response = await self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": _RESPONSE_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format=_NATURAL_RESPONSE_FORMAT,
+                max_tokens=900,  # ~800 tokens of answer plus the JSON envelope
+                extra_body={"prompt_cache_key": _RESPONSE_PROMPT_CACHE_KEY},
+                temperature=0.7  # Slightly higher for more natural responses
+            )
+            
+            reply = orjson.loads(response.choices[0].message.content)
+            natural_response = reply["response"].strip()
+            
+            # Add source attribution if not already present
+            if not reply["mentions_sources"]:
+                natural_response += self._source_attribution(search_results)
+            
+            return natural_response
+            
+        except Exception as e:
+            logger.warning(f"LLM response generation failed: {e}")
+            # Return template-based response
+            return self._generate_template_response(search_results, structured_query)
+    
+    def _build_natural_response_prompt(
+        self, 
+        search_results: List[Dict[str, Any]], 
+        structured_query: StructuredQuery,
+        conversation_context: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        User message for the natural response: query, filters, conversation and results
+        """
         # Prepare context for LLM
         results_summary = self._prepare_results_summary(search_results)
         filters_summary = self._prepare_filters_summary(structured_query.filters)
@@ -553,75 +768,17 @@ ODGOVOR:"""
             if active_entities:
                 conversation_info += f"\nAKTIVNE PREFERENCIJE: {active_entities}\n"
         
-        prompt = f"""
-Ti si TurBot, profesionalni turistički agent. Odgovaraj ljubazno i korisno na srpskom jeziku.
-
-KORISNIKOV UPIT: "{structured_query.semantic_query}"
+        return f"""KORISNIKOV UPIT: "{structured_query.semantic_query}"
 TRAŽI: {filters_summary}
 {conversation_info}
 PRONAĐENI REZULTATI:
-{results_summary}
-
-KRITIČNO - UVEK PRIKAŽI PRONAĐENE REZULTATE:
-- Ako ima rezultata - OBAVEZNO ih pomeni čak i ako se ne poklapaju svi kriterijumi
-- Objasni šta se poklapa a šta ne (lokacija ✓, datum ✗, cena ✓)
-- Daj konkretne opcije sa detaljima (naziv, cena, datum)
-
-PRISTUP:
-- Budi TRANSPARENTAN o poklapanju kriterijuma
-- Uvek prikaži dostupne opcije pa tek onda alternative
-- Koristi profesionalan ali prijatan ton
-- Fokus na KONKRETNE INFORMACIJE i OPCIJE
-
-STRUKTURA ODGOVORA:
-
-1. **POZDRAV**: "Zdravo! [kratka procena]"
-
-2. **DOSTUPNE OPCIJE** (ako ima rezultata):
-   - Navedi 2-3 konkretne opcije sa detaljima
-   - Objasni šta se poklapa a šta ne sa zahtevima
-   
-3. **ALTERNATIVE** (ako se ne poklapaju svi kriterijumi):
-   - Predloži slične opcije ili datume
-   - Objasni zašto su relevantne
-
-4. **POZIV NA AKCIJU**:
-   - "Da li vas neka od ovih opcija zanima?"
-
-VAZNO: Ne pisi eksplicitno delove izmedju ** (npr ** POZDRAV **)
-
-STIL:
-- Profesionalan ali prijatan srpski
-- Direktan i informativan
-- Fokus na KONKRETNE OPCIJE i DETALJE
-- Bez previše casual izraza
-
-ODGOVOR:
-"""
-
-        try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Ti si TurBot, stručni turistički agent. Odgovaraj na srpskom jeziku, prirodno i korisničko."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=800,
-                temperature=0.7  # Slightly higher for more natural responses
-            )
-            
-            natural_response = response.choices[0].message.content.strip()
-            
-            # Add source attribution if not already present
-            if not any(word in natural_response.lower() for word in ["prema", "iz", "dokument", "aranžman"]):
-                natural_response += f"\n\n📋 Informacije su pronađene u {len(search_results)} dokumenata naše baze."
-            
-            return natural_response
-            
-        except Exception as e:
-            logger.warning(f"LLM response generation failed: {e}")
-            # Return template-based response
-            return self._generate_template_response(search_results, structured_query)
+{results_summary}"""
+    
+    def _source_attribution(self, search_results: List[Dict[str, Any]]) -> str:
+        """
+        Source attribution line appended to responses
+        """
+        return f"\n\n📋 Informacije su pronađene u {len(search_results)} dokumenata naše baze."
 
     def _generate_template_response(
         self, 
@@ -668,13 +825,13 @@ ODGOVOR:
             return "\n".join(response_parts)
         
         # Handle case with results
-        template = self.response_templates.get(structured_query.intent, 
+        template = _RESPONSE_TEMPLATES.get(structured_query.intent, 
                                                "Evo rezultata vaše pretrage:")
         response_parts = [template]
         
         for i, result in enumerate(search_results[:3], 1):  # Limit to top 3 results
             document_name = result.get('document_name', 'Nepoznat dokument')
-            content_preview = result.get('content', '')[:200] + "..."
+            content_preview = _preview(result.get('content', ''), 200)
             similarity = result.get('similarity', 0)
             
             response_parts.append(f"{i}. {document_name}")
@@ -733,38 +890,15 @@ ODGOVOR:
         """
         Get alternative months based on requested month
         """
-        month_mapping = {
-            'january': {'adjacent': ['december', 'february'], 'season': 'zimski'},
-            'february': {'adjacent': ['january', 'march'], 'season': 'zimski'},
-            'march': {'adjacent': ['february', 'april'], 'season': 'prolećni'},
-            'april': {'adjacent': ['march', 'may'], 'season': 'prolećni'},
-            'may': {'adjacent': ['april', 'june'], 'season': 'prolećni'},
-            'june': {'adjacent': ['may', 'july'], 'season': 'letnji'},
-            'july': {'adjacent': ['june', 'august'], 'season': 'letnji'},
-            'august': {'adjacent': ['july', 'september'], 'season': 'letnji'},
-            'september': {'adjacent': ['august', 'october'], 'season': 'jesenji'},
-            'october': {'adjacent': ['september', 'november'], 'season': 'jesenji'},
-            'november': {'adjacent': ['october', 'december'], 'season': 'jesenji'},
-            'december': {'adjacent': ['november', 'january'], 'season': 'zimski'}
-        }
-        
-        # Serbian month names
-        serbian_months = {
-            'january': 'januar', 'february': 'februar', 'march': 'mart',
-            'april': 'april', 'may': 'maj', 'june': 'jun',
-            'july': 'jul', 'august': 'avgust', 'september': 'septembar',
-            'october': 'oktobar', 'november': 'novembar', 'december': 'decembar'
-        }
-        
         alternatives = []
         
-        if travel_month in month_mapping:
-            month_info = month_mapping[travel_month]
+        if travel_month in _MONTH_ALTERNATIVES:
+            month_info = _MONTH_ALTERNATIVES[travel_month]
             adjacent_months = month_info['adjacent']
             season = month_info['season']
             
             # Adjacent months
-            serbian_adjacent = [serbian_months.get(m, m) for m in adjacent_months]
+            serbian_adjacent = [_SERBIAN_MONTHS.get(m, m) for m in adjacent_months]
             alternatives.append(f"Proverite aranžmane za {' ili '.join(serbian_adjacent)} - često su slični")
             
             # Seasonal suggestions
@@ -783,21 +917,10 @@ ODGOVOR:
         """
         Get alternative locations based on requested location
         """
-        location_groups = {
-            'Rim': ['Firenca', 'Venecija', 'Milano', 'Napulj'],
-            'Pariz': ['London', 'Amsterdam', 'Brisel', 'Madrid'],
-            'Amsterdam': ['Brisel', 'Pariz', 'Berlin', 'Prag'],
-            'Istanbul': ['Antalija', 'Kapadokija', 'Izmir', 'Bodrum'],
-            'Madrid': ['Barselona', 'Sevilla', 'Lisabon', 'Porto'],
-            'Atina': ['Solun', 'Santorini', 'Mikonos', 'Krit'],
-            'Budva': ['Kotor', 'Herceg Novi', 'Tivat', 'Bar'],
-            'Split': ['Dubrovnik', 'Zadar', 'Pula', 'Rijeka']
-        }
-        
         alternatives = []
         
-        if location in location_groups:
-            similar_cities = location_groups[location][:3]  # Top 3 alternatives
+        if location in _LOCATION_GROUPS:
+            similar_cities = _LOCATION_GROUPS[location][:3]  # Top 3 alternatives
             alternatives.append(f"Slične destinacije: {', '.join(similar_cities)}")
             alternatives.append(f"{location} u drugim mesecima kada možda imamo više opcija")
         else:
@@ -810,17 +933,10 @@ ODGOVOR:
         """
         Get alternative categories based on requested category
         """
-        category_alternatives = {
-            'hotel': ['apartman', 'villa', 'resort', 'pansion'],
-            'tour': ['izlet', 'tura', 'aranžman', 'paket'],
-            'restaurant': ['kafić', 'bar', 'restoran', 'lokalna gastronomija'],
-            'attraction': ['muzej', 'spomenik', 'park', 'kulturna baština']
-        }
-        
         alternatives = []
         
-        if category in category_alternatives:
-            alt_categories = category_alternatives[category][:2]
+        if category in _CATEGORY_ALTERNATIVES:
+            alt_categories = _CATEGORY_ALTERNATIVES[category][:2]
             alternatives.append(f"Razmislite o alternativama: {', '.join(alt_categories)}")
         
         return alternatives
@@ -829,17 +945,10 @@ ODGOVOR:
         """
         Get alternative price ranges based on requested price range
         """
-        price_alternatives = {
-            'budget': ['moderate - možda nešto skuplje ali sa boljim sadržajem'],
-            'moderate': ['budget - ekonomičnije opcije', 'expensive - luksuznije opcije'],
-            'expensive': ['moderate - nešto povoljnije opcije'],
-            'luxury': ['expensive - i dalje kvalitetno ali pristupačnije']
-        }
-        
         alternatives = []
         
-        if price_range in price_alternatives:
-            for alt in price_alternatives[price_range]:
+        if price_range in _PRICE_ALTERNATIVES:
+            for alt in _PRICE_ALTERNATIVES[price_range]:
                 alternatives.append(f"Proverite {alt}")
         
         return alternatives
@@ -860,50 +969,60 @@ ODGOVOR:
         if not search_results:
             return structured_data
         
-        # Aggregate data from results
-        prices = []
-        similarities = []
+        # Aggregate data from results in one pass; dicts dedupe in O(1) and keep
+        # first-seen order, similarity and price are tracked as running totals
+        similarity_sum = 0
+        price_min = price_max = None
+        locations: Dict[str, None] = {}
+        categories: Dict[str, None] = {}
+        amenities_seen: Dict[str, None] = {}
         
         for result in search_results:
             # Extract similarity
-            similarity = result.get('similarity', 0)
-            similarities.append(similarity)
+            similarity_sum += result.get('similarity', 0)
             
             # Extract metadata
-            if 'metadata' in result:
-                metadata = result['metadata']
-                
+            metadata = result.get('metadata')
+            if metadata is not None:
                 # Locations
                 location = metadata.get('location')
-                if location and location not in structured_data["locations"]:
-                    structured_data["locations"].append(location)
+                if location:
+                    locations[location] = None
                 
                 # Categories
                 category = metadata.get('category')
-                if category and category not in structured_data["categories"]:
-                    structured_data["categories"].append(category)
+                if category:
+                    categories[category] = None
                 
                 # Amenities (if available in enhanced metadata)
                 amenities = metadata.get('amenities', [])
                 if isinstance(amenities, list):
                     for amenity in amenities:
-                        if amenity and amenity not in structured_data["amenities"]:
-                            structured_data["amenities"].append(amenity)
+                        if amenity:
+                            amenities_seen[amenity] = None
                 
                 # Prices (if available in enhanced metadata)
                 price_details = metadata.get('price_details', {})
                 if isinstance(price_details, dict):
                     price_per_person = price_details.get('price_per_person')
                     if price_per_person:
-                        prices.append(price_per_person)
+                        if price_min is None:
+                            price_min = price_max = price_per_person
+                        elif price_per_person < price_min:
+                            price_min = price_per_person
+                        elif price_per_person > price_max:
+                            price_max = price_per_person
+        
+        structured_data["locations"] = list(locations)
+        structured_data["categories"] = list(categories)
+        structured_data["amenities"] = list(amenities_seen)
         
         # Calculate aggregated values
-        if similarities:
-            structured_data["average_similarity"] = sum(similarities) / len(similarities)
+        structured_data["average_similarity"] = similarity_sum / len(search_results)
         
-        if prices:
-            structured_data["price_range"]["min"] = min(prices)
-            structured_data["price_range"]["max"] = max(prices)
+        if price_min is not None:
+            structured_data["price_range"]["min"] = price_min
+            structured_data["price_range"]["max"] = price_max
         
         return structured_data
 
@@ -917,13 +1036,14 @@ ODGOVOR:
             source = {
                 "document_name": result.get('document_name', 'Nepoznat dokument'),
                 "similarity": result.get('similarity', 0.0),
-                "content_preview": result.get('content', '')[:300] + "...",
+                "content_preview": _preview(result.get('content', ''), 300),
                 "metadata": result.get('metadata', {})
             }
             
             # Add page number if available
-            if 'page_number' in result and result['page_number']:
-                source["page"] = result['page_number']
+            page_number = result.get('page_number')
+            if page_number:
+                source["page"] = page_number
             
             sources.append(source)
         
@@ -980,22 +1100,14 @@ ODGOVOR:
             metadata = result.get('metadata', {})
             category = metadata.get('category')
             
-            if category in self.suggested_questions_templates:
-                category_suggestions = self.suggested_questions_templates[category]
-                for suggestion in category_suggestions:
+            if category in _SUGGESTED_QUESTIONS:
+                for suggestion in _SUGGESTED_QUESTIONS[category]:
                     if suggestion not in suggestions:
                         suggestions.append(suggestion)
         
         # Add generic suggestions if not enough specific ones
         if len(suggestions) < 3:
-            generic_suggestions = [
-                "Možete li mi dati više detalja o cenama?",
-                "Da li postoje alternativne opcije?",
-                "Kako mogu da rezervišem?",
-                "Da li imate preporuke za dodatne aktivnosti?"
-            ]
-            
-            for suggestion in generic_suggestions:
+            for suggestion in _GENERIC_SUGGESTED_QUESTIONS:
                 if suggestion not in suggestions and len(suggestions) < 4:
                     suggestions.append(suggestion)
         
@@ -1016,12 +1128,12 @@ ODGOVOR:
         confidence = 0.4
         
         # Add confidence from search results quality
-        if search_results:
-            avg_similarity = sum(r.get('similarity', 0) for r in search_results) / len(search_results)
-            confidence += avg_similarity * 0.4
+        result_count = len(search_results)
+        avg_similarity = sum([r.get('similarity', 0) for r in search_results]) / result_count
+        confidence += avg_similarity * 0.4
         
         # Add confidence from number of results
-        result_count_factor = min(len(search_results) / 3, 1.0) * 0.2
+        result_count_factor = min(result_count / 3, 1.0) * 0.2
         confidence += result_count_factor
         
         # Add conversation context confidence
@@ -1039,10 +1151,13 @@ ODGOVOR:
 
 # Singleton pattern for service
 _response_generator = None
+_response_generator_lock = threading.Lock()
 
 def get_response_generator(client: AsyncOpenAI) -> ResponseGenerator:
     """Get or create singleton ResponseGenerator instance"""
     global _response_generator
     if _response_generator is None:
-        _response_generator = ResponseGenerator(client)
+        with _response_generator_lock:
+            if _response_generator is None:
+                _response_generator = ResponseGenerator(client)
     return _response_generator 
\ No newline at end of file
@@ -614,6 +614,24 @@ class VectorService:
         except Exception as e:
             return False
     
+    def delete_stale_chunks(self, document_name: str, keep_ids: List[str]) -> int:
+        """Delete chunks of a document that are not in keep_ids
+        
+        Chunks left from an earlier extraction of the document (another text
+        backend or chunking) would otherwise stay searchable next to the new ones.
+        """
+        try:
+            results = self.collection.get(where={"source_file": document_name})
+            keep = set(keep_ids)
+            stale_ids = [chunk_id for chunk_id in results["ids"] if chunk_id not in keep]
+            if stale_ids:
+                self.collection.delete(ids=stale_ids)
+                logger.info(f"🧹 Removed {len(stale_ids)} stale chunks of {document_name}")
+            return len(stale_ids)
+        except Exception as e:
+            logger.error(f"❌ Error removing stale chunks of {document_name}: {e}")
+            return 0
+    
     def delete_document(self, document_name: str) -> bool:
         """Delete all chunks from a specific document"""
         try:
@@ -0,0 +1,107 @@
+import asyncio
+import sys
+import os
+import re
+from types import SimpleNamespace
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.named_entity_extractor import NamedEntityExtractor, _DURATION_RE, _PRICE_RE, _trie_pattern
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions; records calls, never reaches OpenAI"""
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise RuntimeError("no network in unit tests")
+
+
+def make_extractor():
+    client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()), embeddings=None)
+    return NamedEntityExtractor(client, cache_path=None)
+
+
+def test_price_groups_classify_amount():
+    """The named group that matched both classifies and holds the amount"""
+    cases = {
+        "hotel do 500 eur": ("max_eur", "500"),
+        "od 300 eur na više": ("min_eur", "300"),
+        "oko 250 eur": ("around_eur", "250"),
+        "budžet 800": ("budget", "800"),
+        "budzet 700": (None, None),
+        "budget 700": (None, None),
+        "košta 90": ("cost", "90"),
+        "samo 120€": ("eur", "120"),
+        "5000 din": ("din", "5000"),
+    }
+    for message, (group, amount) in cases.items():
+        match = _PRICE_RE.search(message)
+        if group is None:
+            assert match is None, message
+            continue
+        assert match.lastgroup == group, message
+        assert match.group(match.lastgroup) == amount, message
+
+
+def test_duration_groups_classify_days_and_nights():
+    days = _DURATION_RE.search("putovanje 7 dana")
+    assert (days.lastgroup, days.group(days.lastgroup)) == ("days", "7")
+    nights = _DURATION_RE.search("5 noći u hotelu")
+    assert (nights.lastgroup, nights.group(nights.lastgroup)) == ("nights", "5")
+    assert _DURATION_RE.search("3 noci").lastgroup == "nights"
+
+
+def test_budget_and_duration_entities():
+    extractor = make_extractor()
+    found = extractor._scan_keywords("do 500 eur maksimalno")
+    assert extractor._extract_budget("do 500 eur maksimalno", found)["price_max"] == (500, 0.9)
+    assert extractor._extract_budget("oko 250 eur", set())["price_target"] == (250, 0.8)
+    assert extractor._extract_dates("10 dana", set())["duration_days"] == (10, 0.9)
+    assert extractor._extract_dates("4 noći", set())["duration_nights"] == (4, 0.9)
+
+
+def test_trie_pattern_matches_like_substring_search():
+    """The trie regex reports, per position, the longest word starting there"""
+    words = ["avio", "avion", "let", "leto", "bus", "autobus", "spa", "spavanje"]
+    keyword_re = re.compile("(?=({}))".format(_trie_pattern(words)))
+    for text in ["avionom leti na leto", "autobus spavanje", "ništa", "aviobus"]:
+        expected = set()
+        for start in range(len(text)):
+            starting_here = [word for word in words if text.startswith(word, start)]
+            if starting_here:
+                expected.add(max(starting_here, key=len))
+        assert {match.group(1) for match in keyword_re.finditer(text)} == expected, text
+
+
+def test_keyword_scan_reports_prefixes_and_folded_spellings():
+    extractor = make_extractor()
+    found = extractor._scan_keywords("putujem avionom, tražim smestaj")
+    # "avion" also contains "avio"; the folded "smestaj" is reported as "smeštaj"
+    assert {"avio", "avion", "smeštaj"} <= found
+    assert "let" not in found
+    # Locations get no folded variant
+    assert "niš" not in extractor._scan_keywords("nisam siguran")
+
+
+def test_result_cache_hit_refreshes_timestamps():
+    extractor = make_extractor()
+    message = "Tražim hotel u Rimu za 2 osobe"
+
+    async def run():
+        first = await extractor.extract_entities_from_message(message)
+        await asyncio.sleep(0.01)
+        second = await extractor.extract_entities_from_message(message)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert second.entities.keys() == first.entities.keys()
+    for entity_type, entity in second.entities.items():
+        assert entity.entity_value == first.entities[entity_type].entity_value
+        assert entity.first_mentioned > first.entities[entity_type].first_mentioned
+        assert entity.last_mentioned == entity.first_mentioned
+    # The LLM fallback was tried once; the second call was served from the cache
+    assert extractor.client.chat.completions.calls <= 1
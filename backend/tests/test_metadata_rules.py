@@ -0,0 +1,101 @@
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.metadata_enhancement_service import (
+    CHEAP_EXTRACTION_CONFIDENCE,
+    MetadataEnhancementService,
+    _FILENAME_HINTS,
+    _filename_hints,
+)
+
+
+def make_service():
+    # The fake client is never called by the rule-based paths under test
+    return MetadataEnhancementService(SimpleNamespace(chat=None))
+
+
+def test_filename_hints_classify_each_field():
+    hints = _filename_hints("Rim_Avio_Program_2025.pdf")
+    assert dict(hints) == {"destination": "Rim", "transport_type": "plane", "category": "tour"}
+    assert dict(_filename_hints("katalog.pdf")) == {}
+
+
+def baseline_filename_hints(filename):
+    """Per field, the first keyword in table order that occurs in the filename"""
+    hints = {}
+    for keyword, (field, value) in _FILENAME_HINTS.items():
+        if keyword in filename.lower() and field not in hints:
+            hints[field] = value
+    return hints
+
+
+def test_filename_hints_match_first_keyword_per_field():
+    filenames = [
+        "roma_paris.pdf",
+        "Romanticna_Francuska_bus.pdf",  # "roma" ranks before "romanticna_francuska"
+        "pariz_avionom.pdf",             # "avio" and "avion" overlap
+        "portugalska_cenovnik_putovanja.pdf",
+        "barcelona_bari_program.pdf",
+        "maroko_morocco_autobus.pdf",
+        "Pulja_2025.pdf",
+    ]
+    for filename in filenames:
+        assert dict(_filename_hints(filename)) == baseline_filename_hints(filename), filename
+
+
+def test_filename_hints_are_read_only_and_memoized():
+    hints = _filename_hints("istanbul_avio_cenovnik.pdf")
+    assert hints is _filename_hints("istanbul_avio_cenovnik.pdf")
+    try:
+        hints["destination"] = "Beograd"
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("cached hints must not be writable")
+
+
+def test_cheap_extract_needs_filename_hints_prices_and_one_duration():
+    service = make_service()
+    content = "Aranžman 7 dana, cena 450 eur po osobi, doplata 120 eur."
+    metadata = service._try_cheap_extract(content, "rim_avio_program.pdf")
+    assert metadata.destination == "Rim"
+    assert metadata.duration_days == 7
+    assert metadata.price_range == "expensive"
+    assert metadata.confidence_score == CHEAP_EXTRACTION_CONFIDENCE
+    # Missing transport hint, two durations, no prices or non-EUR prices fall through to the LLM
+    assert service._try_cheap_extract(content, "rim_program.pdf") is None
+    assert service._try_cheap_extract("5 dana ili 7 dana, 450 eur", "rim_avio_program.pdf") is None
+    assert service._try_cheap_extract("7 dana u Rimu", "rim_avio_program.pdf") is None
+    assert service._try_cheap_extract("7 dana, 45000 din", "rim_avio_program.pdf") is None
+
+
+def test_cheap_extract_fills_the_fields_the_llm_would():
+    service = make_service()
+    metadata = service._try_cheap_extract(
+        "Polazak u maju, 7 dana, 450 eur po osobi, deca do 12 godina 300 eur.", "rim_avio_program.pdf"
+    )
+    assert metadata.travel_month == "may"
+    assert metadata.seasonal == "spring"
+    assert metadata.family_friendly is True
+    assert metadata.price_details == '{"prices":[300.0,450.0],"currency":"EUR"}'
+
+    # Month from the filename, declined forms; no month or season word means year-round
+    assert service._try_cheap_extract("7 dana, 450 eur", "rim_avio_program_avgust.pdf").travel_month == "august"
+    assert service._try_cheap_extract("do 15. septembra, 7 dana, 450 eur", "rim_avio_program.pdf").seasonal == "autumn"
+    year_round = service._try_cheap_extract("7 dana, 450 eur, let traje 2h", "rim_avio_program.pdf")
+    assert (year_round.travel_month, year_round.seasonal, year_round.family_friendly) == (None, "year_round", False)
+    assert service._try_cheap_extract("letnji aranžman, 7 dana, 450 eur", "rim_avio_program.pdf").seasonal == "summer"
+
+
+def test_cheap_extract_leaves_ambiguous_dates_to_the_llm():
+    service = make_service()
+    for content in [
+        "Polasci u maju i junu, 7 dana, 450 eur",  # several months
+        "Doček Nove godine, 7 dana, 450 eur",       # holiday spans two months
+        "Zimski aranžman u julu, 7 dana, 450 eur",  # season contradicts the month
+    ]:
+        assert service._try_cheap_extract(content, "rim_avio_program.pdf") is None, content
@@ -0,0 +1,109 @@
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import services.pdf_processor as pdf_processor
+from services.pdf_processor import PDFProcessor, _iter_pdfium_page_parts, _page_count
+
+
+def write_pdf(path, pages):
+    """Write a minimal PDF; each page is (text lines, draw a 3x3 table grid)"""
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    number = 4
+    for lines, with_table in pages:
+        ops = [f"BT /F1 10 Tf 50 {780 - i * 14} Td ({line}) Tj ET" for i, line in enumerate(lines)]
+        if with_table:
+            ops += [f"50 {300 - row * 20} m 500 {300 - row * 20} l S" for row in range(4)]
+            ops += [f"{50 + col * 150} 300 m {50 + col * 150} 240 l S" for col in range(4)]
+            ops += [f"BT /F1 9 Tf {55 + col * 150} {286 - row * 20} Td (cell {row}{col}) Tj ET"
+                    for row in range(3) for col in range(3)]
+        content = "\n".join(ops).encode()
+        objects[number] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                           f"/Resources << /Font << /F1 3 0 R >> >> /Contents {number + 1} 0 R >>").encode()
+        objects[number + 1] = b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+        kids.append(f"{number} 0 R")
+        number += 2
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    data = b"%PDF-1.4\n"
+    offsets = {}
+    for key in sorted(objects):
+        offsets[key] = len(data)
+        data += f"{key} 0 obj\n".encode() + objects[key] + b"\nendobj\n"
+    xref = len(data)
+    data += f"xref\n0 {number}\n0000000000 65535 f \n".encode()
+    data += b"".join(f"{offsets[key]:010d} 00000 n \n".encode() for key in range(1, number))
+    data += f"trailer\n<< /Size {number} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def brochure(tmp_path):
+    return write_pdf(tmp_path / "rim_avio.pdf", [
+        (["Aranzman Rim leto. Polazak iz Beograda.", "Cena 450 eur po osobi."], False),
+        (["Program putovanja: Dan 1 dolazak.", "Dan 2 obilazak grada."], True),
+        (["Napomena: 7 dana, avio prevoz."], False),
+    ])
+
+
+def test_pdfium_pages_include_text_and_tables(brochure):
+    parts = list(_iter_pdfium_page_parts(brochure, 0, 3))
+    text = "".join(parts)
+    for page_num in (1, 2, 3):
+        assert f"--- Strana {page_num} ---" in text
+    assert "Cena 450 eur po osobi." in text
+    # Only the page with ruling lines goes through pdfplumber table extraction
+    assert text.count("Tabela:") == 1
+    assert "cell 11" in text
+
+
+def test_pdfium_extraction_is_consistent_across_threads(brochure, monkeypatch):
+    monkeypatch.setattr(pdf_processor, "PDF_TEXT_BACKEND", "pdfium")
+    expected = "".join(_iter_pdfium_page_parts(brochure, 0, _page_count(brochure)))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            lambda _: "".join(_iter_pdfium_page_parts(brochure, 0, _page_count(brochure))), range(8)
+        ))
+    assert results == [expected] * 8
+
+
+def test_chunk_ids_depend_on_backend(monkeypatch):
+    processor = PDFProcessor(cache_dir=None)
+    plumber_ids = processor._generate_chunk_ids("rim.pdf", 3)
+    monkeypatch.setattr(pdf_processor, "PDF_TEXT_BACKEND", "pdfium")
+    pdfium_ids = processor._generate_chunk_ids("rim.pdf", 3)
+    assert len(set(plumber_ids)) == 3
+    assert not set(plumber_ids) & set(pdfium_ids)
+
+
+def test_process_pdf_backends_share_content(brochure, monkeypatch):
+    processor = PDFProcessor(chunk_size=20, chunk_overlap=5, cache_dir=None)
+    plumber_doc = processor.process_pdf(brochure)
+    monkeypatch.setattr(pdf_processor, "PDF_TEXT_BACKEND", "pdfium")
+    pdfium_doc = processor.process_pdf(brochure)
+    assert plumber_doc.processing_status == pdfium_doc.processing_status == "success"
+    for doc in (plumber_doc, pdfium_doc):
+        text = " ".join(chunk.text for chunk in doc.chunks)
+        assert "Cena 450 eur" in text and "cell 22" in text
+
+
+def test_streamed_chunking_matches_whole_text():
+    """Chunking page segments as they stream equals chunking the joined text"""
+    processor = PDFProcessor(chunk_size=12, chunk_overlap=3, cache_dir=None)
+    segments = [
+        "\n\n--- Strana 1 ---\n\n", "Prva rečenica je ovde. Druga rečenica se nastavlja",
+        "\n\n--- Strana 2 ---\n\n", " i preko strane! Treća? ",
+        "", "Jedna veoma duga rečenica koja ima mnogo više reči nego što staje u jedan deo teksta.",
+    ]
+    assert processor._create_chunks(iter(segments)) == processor._create_chunks("".join(segments))
+    assert processor._create_chunks("") == []
@@ -0,0 +1,63 @@
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.query_expansion_service import QueryExpansionService
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions; fails until told otherwise"""
+    def __init__(self):
+        self.calls = 0
+        self.failing = True
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError("simulated rate limit")
+        content = '{"terms": ["hotel", "smeštaj", "apartman", "Rim", "Roma"]}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeEmbeddings:
+    async def create(self, model, input):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0, 0.0, 0.0])])
+
+
+def make_service(tmp_path):
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions), embeddings=FakeEmbeddings())
+    return QueryExpansionService(client, cache_path=tmp_path / "expansions.sqlite3"), completions
+
+
+def test_fallback_expansion_is_not_cached(tmp_path):
+    service, completions = make_service(tmp_path)
+
+    async def run():
+        fallback = await service.expand_query_llm("hotel u Rimu")
+        completions.failing = False
+        expanded = await service.expand_query_llm("hotel u Rimu")
+        repeated = await service.expand_query_llm("hotel u Rimu")
+        return fallback, expanded, repeated
+
+    fallback, expanded, repeated = asyncio.run(run())
+    assert "roma" in fallback  # synonym fallback, lowercased
+    assert expanded == repeated == "hotel OR smeštaj OR apartman OR Rim OR Roma"
+    # The failed call stored nothing, so the second call reached the LLM; the third hit the cache
+    assert completions.calls == 2
+    rows = service._disk.execute("SELECT value FROM expansion_cache").fetchall()
+    assert rows == [(expanded,)]
+
+
+def test_expansions_persist_across_instances(tmp_path):
+    service, completions = make_service(tmp_path)
+    completions.failing = False
+    expanded = asyncio.run(service.expand_query_llm("Hotel u Rimu"))
+
+    restarted, restarted_completions = make_service(tmp_path)
+    assert asyncio.run(restarted.expand_query_llm("hotel u rimu")) == expanded
+    assert restarted_completions.calls == 0
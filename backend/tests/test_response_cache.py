@@ -0,0 +1,112 @@
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.response_generator import ResponseGenerator
+from services.self_querying_service import StructuredQuery
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions; answers every call with a numbered reply"""
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs["messages"][-1]["content"].endswith("PITANJE: fail"):
+            raise RuntimeError("simulated OpenAI error")
+        reply = SimpleNamespace(content=f"odgovor {len(self.calls)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=reply)], usage=None)
+
+
+def make_generator():
+    completions = FakeCompletions()
+    return ResponseGenerator(SimpleNamespace(chat=SimpleNamespace(completions=completions))), completions
+
+
+def make_query(text="hotel u Rimu"):
+    return StructuredQuery(semantic_query=text, filters={"location": "Rim"}, intent="search", confidence=0.9)
+
+
+def make_results(similarity=0.81):
+    return [{"id": "chunk_1", "content": "Hotel Roma", "metadata": {"location": "Rim"},
+             "similarity": similarity, "document_name": "rim.pdf"}]
+
+
+def make_context(content="hotel u Rimu", timestamp="2025-06-22T10:00:00"):
+    return {
+        "recent_conversation": [{"role": "user", "content": content, "timestamp": timestamp}],
+        "active_entities": {"destination": "Rim"},
+    }
+
+
+def test_cache_key_ignores_timestamps_and_similarity():
+    generator, _ = make_generator()
+    first = generator._get_response_cache_key(make_results(0.81), make_query(), make_context(timestamp="10:00"))
+    second = generator._get_response_cache_key(make_results(0.8100001), make_query(), make_context(timestamp="10:05"))
+    assert first == second
+    hash(first)
+
+
+def test_cache_key_separates_query_results_and_conversation():
+    generator, _ = make_generator()
+    key = generator._get_response_cache_key(make_results(), make_query(), make_context())
+    other_results = [dict(make_results()[0], id="chunk_2")]
+    assert key != generator._get_response_cache_key(other_results, make_query(), make_context())
+    assert key != generator._get_response_cache_key(make_results(), make_query("hotel u Parizu"), make_context())
+    assert key != generator._get_response_cache_key(make_results(), make_query(), make_context(content="drugo"))
+    assert key != generator._get_response_cache_key(make_results(), make_query(), None)
+
+
+def test_results_without_id_are_keyed_by_content():
+    generator, _ = make_generator()
+    results = [{"content": "Hotel Roma", "similarity": 0.8}]
+    key = generator._get_response_cache_key(results, make_query(), None)
+    assert key == generator._get_response_cache_key([{"content": "Hotel Roma", "similarity": 0.7}], make_query(), None)
+    assert key != generator._get_response_cache_key([{"content": "Hotel Milano", "similarity": 0.8}], make_query(), None)
+
+
+def test_repeated_question_is_served_from_cache():
+    generator, completions = make_generator()
+
+    async def run():
+        first = await generator.generate_response(make_results(), make_query(), make_context(timestamp="10:00"))
+        first.sources.append("caller mutation")
+        second = await generator.generate_response(make_results(), make_query(), make_context(timestamp="10:05"))
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(completions.calls) == 1
+    assert second.response == first.response == "odgovor 1"
+    # Callers get copies, so mutating one result doesn't reach the cache
+    assert "caller mutation" not in second.sources
+
+
+def test_standard_prompt_prefix_is_static():
+    generator, completions = make_generator()
+
+    async def run():
+        await generator.generate_response(make_results(), make_query(), make_context())
+        await generator.generate_response(make_results(), make_query("hotel u Parizu"), None)
+
+    asyncio.run(run())
+    first, second = completions.calls
+    assert first["messages"][0] == second["messages"][0]
+    assert first["extra_body"]["prompt_cache_key"] == second["extra_body"]["prompt_cache_key"]
+    assert first["messages"][1]["content"].endswith("PITANJE: hotel u Rimu")
+
+
+def test_failed_responses_are_not_cached():
+    generator, completions = make_generator()
+
+    async def run():
+        for _ in range(2):
+            await generator.generate_response(make_results(), make_query("fail"), None)
+
+    asyncio.run(run())
+    assert len(completions.calls) == 2
+    assert not generator.cache